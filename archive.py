@@ -0,0 +1,107 @@
+import importlib.util
+import os
+import re
+import threading
+
+import pandas as pd
+import streamlit as st
+
+import perf
+from schema import SCHEMAS
+
+# --- 營運報表歷史封存：已結束的月份以 Parquet 分區保存，營運報表 (試算表) 只留目前的期間 ---
+# 路徑為 <root>/<試算表>/year=2026/month=03/part.parquet (hive 分區，一個門市、一個月一個檔案)。
+# 讀取時先依路徑只挑出涵蓋區間的分區，再以 pyarrow dataset 的 filter 依「日期」下推 (利用 row group 統計值)，
+# 並只讀取需要的欄位。pyarrow 為選用套件，在函式內 import；未安裝時 available() 為 False，頁面隱藏封存功能。
+# 封存後營運報表的列會被刪除，所以只有明確設定了封存路徑 (configured()) 才允許封存：預設的 local_data/archive
+# 在 Streamlit Cloud 等環境是容器內的暫存磁碟，重新部署就消失。未設定時仍讀取預設路徑 (先前封存的月份照常顯示)。
+DEFAULT_PATH = os.path.join("local_data", "archive")
+
+def available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _arrow_schema(pa):
+    # int32 欄位以 float64 保存 (與 schema 相同：有小數時不截斷)，讀回時全為整數再轉回 int32
+    types = {"date": pa.date32(), "int32": pa.float64(), "float32": pa.float32(), "str": pa.string()}
+    return pa.schema([(name, types[kind]) for name, kind, _ in SCHEMAS["daily"].columns])
+
+def _restore_types(df):
+    for name, kind, _ in SCHEMAS["daily"].columns:
+        if name not in df.columns: continue
+        if kind == "int32" and ((df[name] % 1) == 0).all() and (df[name].abs() < 2**31).all(): df[name] = df[name].astype("int32")
+    return df
+
+class HistoryArchive:
+    """單一目錄下的營運報表封存；寫入以「日期」為鍵併入該月分區，讀取只掃描需要的分區與欄位。"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _store_dir(self, sheet_name):
+        return os.path.join(self.root, re.sub(r'[\\/:*?"<>|]', "_", sheet_name))
+
+    def path(self, sheet_name, year, month):
+        return os.path.join(self._store_dir(sheet_name), f"year={year}", f"month={month:02d}", "part.parquet")
+
+    def months(self, sheet_name):
+        """已封存的 [(年, 月), ...] (遞增)。"""
+        base, out = self._store_dir(sheet_name), []
+        if not os.path.isdir(base): return out
+        for y in os.listdir(base):
+            year = re.fullmatch(r"year=(\d{4})", y)
+            if not year: continue
+            for m in os.listdir(os.path.join(base, y)):
+                month = re.fullmatch(r"month=(\d{2})", m)
+                if month and os.path.exists(self.path(sheet_name, int(year.group(1)), int(month.group(1)))):
+                    out.append((int(year.group(1)), int(month.group(1))))
+        return sorted(out)
+
+    def write_month(self, sheet_name, year, month, frame):
+        """frame (營運報表的列) 併入 (year, month) 分區，同一天以 frame 為準；先寫暫存檔再取代。回傳分區列數。"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        names = SCHEMAS["daily"].names
+        rows = SCHEMAS["daily"].parse(SCHEMAS["daily"].to_rows(frame))  # 只留 schema 欄位並統一型別
+        path = self.path(sheet_name, year, month)
+        with perf.span("archive.write", sheet=sheet_name, month=f"{year}-{month:02d}") as attrs, self._lock:
+            if os.path.exists(path):
+                old = pq.read_table(path).to_pandas()
+                rows = pd.concat([old[~old["日期"].isin(rows["日期"])], rows], ignore_index=True)
+            rows = rows.sort_values("日期", kind="stable")[names]
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            table = pa.Table.from_pandas(rows, schema=_arrow_schema(pa), preserve_index=False)
+            pq.write_table(table, path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+            attrs["rows"] = len(rows)
+        return len(rows)
+
+    def read(self, sheet_name, start, end, columns=None):
+        """start~end (含) 的營運報表列；columns 為要讀取的欄位 (「日期」一定包含)，None 為全部欄位。"""
+        names = ["日期"] + [c for c in columns if c != "日期"] if columns else SCHEMAS["daily"].names
+        paths = [self.path(sheet_name, y, m) for y, m in self.months(sheet_name)
+                 if (start.year, start.month) <= (y, m) <= (end.year, end.month)]
+        if not paths: return SCHEMAS["daily"].empty()[names]
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        with perf.span("archive.read", sheet=sheet_name, partitions=len(paths)) as attrs:
+            dataset = ds.dataset(paths, format="parquet", schema=_arrow_schema(pa))
+            table = dataset.to_table(columns=names, filter=(ds.field("日期") >= start) & (ds.field("日期") <= end))
+            df = _restore_types(table.to_pandas())
+            attrs["rows"] = len(df)
+        return df
+
+def _archive_config():
+    try: config = dict(st.secrets.get("archive", {}))
+    except Exception: config = {}
+    path = os.environ.get("ARCHIVE_PATH") or config.get("path")
+    return {"path": path or DEFAULT_PATH, "configured": bool(path)}
+
+def configured():
+    """是否明確設定了封存路徑 (環境變數 ARCHIVE_PATH 或 secrets 的 [archive] path)。"""
+    return _archive_config()["configured"]
+
+@st.cache_resource(show_spinner=False)
+def get_archive():
+    """依 secrets 的 [archive] path 或環境變數 ARCHIVE_PATH 建立 (未設定時為 local_data/archive，只供讀取)。"""
+    return HistoryArchive(_archive_config()["path"])
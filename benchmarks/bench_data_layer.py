@@ -0,0 +1,244 @@
+"""資料層效能基準：以記憶體中的假 Google 試算表 (fake_sheets.py) 量測讀取、儲存、編輯合併、KPI 與區域彙整。
+
+load_data_snapshot 量測已有共用快照時的讀取，concurrent_reads 量測多個 session 同時讀取時的請求合併，load_data_429x3 量測連續 429 後的退避重試，import_pos_exports 量測整份多門市 POS 匯出檔的逐段匯入。
+每個案例回報牆鐘時間 (重複數次取中位數)、API 呼叫次數與峰值記憶體 (tracemalloc)，並與 baseline.json 比較；
+超過容許範圍即列為退步並以 exit code 1 結束。完全離線，不需要 GCP 憑證。
+
+    python benchmarks/bench_data_layer.py                        # 預設矩陣 (1/10 年 x 1/50 店)
+    python benchmarks/bench_data_layer.py --years 3 --stores 5 --latency 0.05
+    python benchmarks/bench_data_layer.py --update-baseline      # 以這次結果覆寫 baseline.json
+
+時間與記憶體和機器有關；換機器後請先 --update-baseline 再比較。
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["STORAGE_BACKEND"] = "sheets"
+
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_sheets import FakeClient
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+MATRIX = [(1, 1), (1, 50), (10, 1), (10, 50)]
+
+def quiet_streamlit():
+    """關掉 bare mode (沒有 streamlit run) 下每個快取函式都會印的 "No runtime found" 等警告。"""
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"): logging.getLogger(name).setLevel(logging.ERROR)
+
+def synthetic_tables(years, seed=0):
+    """years 年份的營運報表 (自 2026-01-01 起逐日) 與禮盒 / 休假 / 商品資料，格式同 get_all_values()。"""
+    from schema import SCHEMAS
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2026-01-01", periods=365 * years, freq="D")
+    daily = pd.DataFrame({"日期": dates.date})
+    for name, kind, _ in SCHEMAS["daily"].columns[1:]:
+        if kind == "int32": daily[name] = rng.integers(0, 500, len(dates))
+        elif kind == "float32": daily[name] = np.round(rng.uniform(0, 40, len(dates)), 1)
+    daily["目標PSD"] = 120000
+    daily["實績PSD"] = rng.integers(80000, 160000, len(dates))
+    daily["ADT"] = rng.integers(200, 400, len(dates))
+    seasons = ["母親節", "端午節", "父親節", "中秋節", "CNY", "其他"]
+    gift = pd.DataFrame({"檔期": rng.choice(seasons, 60), "品項": [f"禮盒{i}" for i in range(60)],
+                         "原始控量": 100, "剩餘控量": rng.integers(0, 100, 60)})
+    leave = pd.DataFrame({"夥伴姓名": [f"夥伴{i}" for i in range(40)], "職級": "正職", "假別週期": "20260101~20261231",
+                          "特休_剩餘": 8.0, "代休_剩餘": 2.0})
+    product = pd.DataFrame({"檔期": rng.choice(["Summer1", "Summer2", "Fall", "Holiday"], 200 * years),
+                            "分類": rng.choice(["飲料", "食物", "商品"], 200 * years),
+                            "品號": [str(11000000 + i) for i in range(200 * years)],
+                            "品名": [f"新品{i}號" for i in range(200 * years)], "售價": 150,
+                            "訂貨日": "2026-10-20", "上市日": "2026-10-28"})
+    return {t: [[str(v) for v in r] for r in SCHEMAS[t].to_rows(df)] for t, df in
+            (("daily", daily), ("gift", gift), ("leave", leave), ("product", product))}
+
+def pos_export(path, stores, years, seed=0):
+    """POS 匯出檔 (CSV)：每家門市每天一列，欄位名稱用 POS 的叫法 (營業日期 / 營業額 / 來客數 …)。"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2026-01-01", periods=365 * years, freq="D").strftime("%Y/%m/%d")
+    n = len(dates) * len(stores)
+    pd.DataFrame({"門市": np.repeat(stores, len(dates)), "營業日期": np.tile(dates, len(stores)),
+                  "營業額": rng.integers(80000, 160000, n), "來客數": rng.integers(200, 400, n),
+                  "foodpanda": rng.integers(0, 5000, n), "工時": np.round(rng.uniform(20, 40, n), 1)}).to_csv(path, index=False)
+    return path
+
+class Bench:
+    def __init__(self, years, stores, latency, repeat):
+        import perf
+        import storage
+        perf.get_recorder()  # 建立紀錄器時會讀取 secrets，先建好再調整 log level
+        quiet_streamlit()
+        self.years, self.stores, self.latency, self.repeat = years, stores, latency, repeat
+        self.storage = storage
+        self.client = FakeClient(latency)
+        self.names = [f"Bench_Store_{i:02d}" for i in range(stores)]
+        for name in self.names: self.client.create_book(name, synthetic_tables(years, seed=len(name)))
+        storage.get_gspread_client = lambda: self.client
+        import data_layer
+        self.app = data_layer
+        self.app.load_store_registry = lambda: [{"name": n, "sheet": n} for n in self.names]
+        storage.get_storage().delay = 0.0
+        # 令牌桶不限流 (否則量到的是配額等待)；退避縮短，讓 429 案例只反映重試次數
+        limiter = storage.get_rate_limiter()
+        limiter.rate_per_minute, limiter.backoff = 0, 0.01
+        quiet_streamlit()  # 讀取 secrets / config 時 streamlit 會重設 log level，所以放在建立後端之後
+
+    def reset(self):
+        import streamlit as st
+        st.cache_data.clear()
+        self.app.get_snapshot_store().clear()
+        self.app.load_region_data.clear()
+        self.storage.reset_handle_cache()
+        self.storage.get_sheet_snapshots()["rows"].clear()
+        self.app.build_product_index.clear()
+
+    def measure(self, name, setup, run):
+        """先重複 repeat 次量時間 (不開 tracemalloc)，再以一次追蹤記憶體的執行量 API 次數與峰值記憶體。"""
+        walls = []
+        for _ in range(self.repeat):
+            state = setup()
+            started = time.perf_counter()
+            run(state)
+            self.storage.get_storage().flush(60)
+            walls.append(time.perf_counter() - started)
+        state = setup()
+        before = self.client.api.total()
+        tracemalloc.start()
+        run(state)
+        self.storage.get_storage().flush(60)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        key = f"{name}[years={self.years},stores={self.stores},latency={self.latency}]"
+        return key, {"wall_s": round(statistics.median(walls), 4), "api_calls": self.client.api.total() - before, "peak_kb": peak // 1024}
+
+    def cases(self):
+        app, sheet = self.app, self.names[0]
+
+        def cold():
+            self.reset()
+
+        def warm():
+            self.reset()
+            return app.load_data(sheet)
+
+        def october():
+            df = warm()
+            return df[(df["Year"] == 2026) & (df["Month"] == 10)]
+
+        def edits(df):
+            month = df[(df["Year"] == 2026) & (df["Month"] == 10)].copy()
+            month["實績PSD"] = month["實績PSD"] + 1
+            month["日工時"] = month["日工時"] + 0.5
+            cols = {"kpi": ['目標PSD', '實績PSD', 'ADT', '備註'],
+                    "prod": ['糕點PSD', '糕點USD', '糕點報廢USD', 'Retail', 'CB', '現烤', 'BAF', '節慶USD'],
+                    "special": ['三星蔥寶寶', '竹筍寶寶', '車掌造型娃包', '車長冷水壺', '木紋不鏽鋼杯'],
+                    "delivery": ['foodpanda', 'foodomo', 'MOP'], "labor": ['日工時', 'IPLH']}
+            return [month[["顯示日期", "日期"] + c] for c in cols.values()]
+
+        def kpi(df):
+            app.build_ai_prompt.clear()
+            cube = app.build_kpi_cube(df)
+            month = df[(df["Year"] == 2026) & (df["Month"] == 10)]
+            totals = cube["month"].loc[(2026, 10)]
+            kpi = app.kpis_from_totals(totals, 120000 * 31)
+            return app.build_ai_prompt(month, ("bench", 0), "bench", (2026, 10, "全月累計", None), "2026年 10月", kpi["total_target"])
+
+        def concurrent_reads(_, sessions=8):
+            """sessions 個執行緒同時冷讀同一張試算表；相同讀取應合併成一次請求。"""
+            barrier = threading.Barrier(sessions)
+            def read(_):
+                barrier.wait()
+                return self.storage.get_storage().read_tables(sheet)
+            latency, self.client.api.latency = self.client.api.latency, max(self.client.api.latency, 0.02)
+            try:
+                with ThreadPoolExecutor(sessions) as pool: list(pool.map(read, range(sessions)))
+            finally:
+                self.client.api.latency = latency
+
+        def rate_limited(_):
+            self.client.api.fail_next(3, 429)
+            if app.load_data(sheet).empty: raise RuntimeError("連續 429 後重試仍讀取失敗")
+
+        yield self.measure("load_data", cold, lambda _: app.load_data(sheet))
+        yield self.measure("load_data_snapshot", warm, lambda _: app.load_data(sheet))
+        yield self.measure("concurrent_reads", cold, concurrent_reads)
+        yield self.measure("load_data_429x3", cold, rate_limited)
+        # 與頁面相同：只合併、儲存目前月份的列
+        yield self.measure("merge_daily_edits", october, lambda m: app.merge_daily_edits(m, *edits(m)))
+        yield self.measure("save_data_to_sheet", october, lambda m: app.save_data_to_sheet(sheet, m, app.merge_daily_edits(m, *edits(m))))
+        yield self.measure("kpi_section", warm, kpi)
+        stores = tuple((n, n) for n in self.names)
+        yield self.measure("load_region_data", cold, lambda _: app.load_region_data(stores, tuple((0, 0) for _ in stores)))
+
+        def pos_import(path):
+            if app.import_pos_exports([(os.path.basename(path), path)], sheet, sheet) is None: raise RuntimeError("匯入失敗")
+        # 逐段讀取：峰值記憶體應與「門市數 x 天數」的彙總同級，而不是整個匯出檔
+        with tempfile.TemporaryDirectory() as tmp:
+            export = pos_export(os.path.join(tmp, "pos.csv"), self.names, self.years)
+            yield self.measure("import_pos_exports", lambda: cold() or export, pos_import)
+
+def compare(results, baseline, tolerance, floor_s):
+    """回傳退步清單：時間超過 baseline * (1 + tolerance) 且差距大於 floor_s、API 次數變多、峰值記憶體超過容許範圍。"""
+    regressions = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b: continue
+        if r["wall_s"] > b["wall_s"] * (1 + tolerance) and r["wall_s"] - b["wall_s"] > floor_s:
+            regressions.append(f"{key}: wall {b['wall_s']:.4f}s -> {r['wall_s']:.4f}s")
+        if r["api_calls"] > b["api_calls"]:
+            regressions.append(f"{key}: api_calls {b['api_calls']} -> {r['api_calls']}")
+        if r["peak_kb"] > b["peak_kb"] * (1 + tolerance) and r["peak_kb"] - b["peak_kb"] > 1024:
+            regressions.append(f"{key}: peak {b['peak_kb']}KB -> {r['peak_kb']}KB")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, help="資料年數 (1-10)；與 --stores 都省略時跑預設矩陣")
+    parser.add_argument("--stores", type=int, help="門市數 (1-50)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次 API 呼叫的模擬延遲秒數")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="容許的相對退步比例")
+    parser.add_argument("--floor", type=float, default=0.02, help="時間差小於此秒數不算退步")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    grid = [(args.years or 1, args.stores or 1)] if args.years or args.stores else MATRIX
+
+    results = {}
+    for years, stores in grid:
+        bench = Bench(years, stores, args.latency, args.repeat)
+        for key, r in bench.cases():
+            results[key] = r
+            print(f"{key:<70} {r['wall_s'] * 1000:9.1f} ms {r['api_calls']:6d} calls {r['peak_kb']:9d} KB", flush=True)
+
+    baseline = json.load(open(args.baseline, encoding="utf-8")) if os.path.exists(args.baseline) else {}
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baseline.items())), f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"baseline 已更新：{args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance, args.floor)
+    for line in regressions: print("REGRESSION", line)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
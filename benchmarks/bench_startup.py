@@ -0,0 +1,95 @@
+"""啟動預算：在全新的 Python process 中以 AppTest 執行 app.py (本機 SQLite 後端)，量測冷啟動與每次重新執行的耗時。
+
+檢查項目 (任何一項不符即以 exit code 1 結束)：
+  first_run_ms   第一次執行 (含 import 資料層、第一個頁面、建立空白營運報表)
+  rerun_ms       之後在同一頁重新執行的中位數 (Streamlit 每次點擊的成本)
+  switch_ms      切換到另一個頁面的第一次執行
+  lazy imports   SQLite 後端不載入 gspread / oauth2client，也不載入 openpyxl (只在匯入 XLSX 時使用)；只 import 造訪過的頁面模組
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --first-run-ms 3000 --rerun-ms 150   # 較慢的機器放寬預算
+
+時間和機器有關；預設預算以一般筆電為準，CI 較慢時請放寬。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY = ("gspread", "oauth2client", "openpyxl")
+FIRST_PAGE, SECOND_PAGE = "📊 每日營運報表", "🎁 節慶禮盒控管"
+
+def child(path, repeat):
+    """在子 process 中執行：回傳量測結果 (JSON 印到 stdout 最後一行)。"""
+    os.environ.update(STORAGE_BACKEND="sqlite", STORAGE_PATH=path)
+    sys.path.insert(0, ROOT)
+    import logging
+    from streamlit.testing.v1 import AppTest
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    started = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - started
+    reruns = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        at.run()
+        reruns.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    at.sidebar.radio[0].set_value(SECOND_PAGE).run()
+    switch = time.perf_counter() - started
+    return {
+        "first_run_ms": round(first * 1000, 1),
+        "rerun_ms": round(statistics.median(reruns) * 1000, 1),
+        "switch_ms": round(switch * 1000, 1),
+        "exceptions": [str(e.value) for e in at.exception],
+        "lazy_loaded": sorted({m.split(".")[0] for m in sys.modules if m.split(".")[0] in LAZY}),
+        "views": sorted(m for m in sys.modules if m.startswith("views.")),
+    }
+
+def check(result, budgets):
+    """回傳違反預算的清單。"""
+    from views import PAGES
+    failures = [f"{k}: {result[k]:.1f} ms > {v:.0f} ms" for k, v in budgets.items() if result[k] > v]
+    if result["exceptions"]: failures.append(f"執行時發生例外：{result['exceptions']}")
+    if result["lazy_loaded"]: failures.append(f"SQLite 後端不應載入：{', '.join(result['lazy_loaded'])}")
+    expected = sorted(f"views.{PAGES[p]}" for p in (FIRST_PAGE, SECOND_PAGE))
+    if result["views"] != expected: failures.append(f"頁面模組應只有 {expected}，實際為 {result['views']}")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--first-run-ms", type=float, default=1500)
+    parser.add_argument("--rerun-ms", type=float, default=75)
+    parser.add_argument("--switch-ms", type=float, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child, args.repeat), ensure_ascii=False))
+        return 0
+
+    with tempfile.TemporaryDirectory() as path:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, "--repeat", str(args.repeat)],
+                              capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        print(proc.stderr[-2000:])
+        return 1
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    for key in ("first_run_ms", "rerun_ms", "switch_ms"): print(f"{key:<14} {result[key]:9.1f} ms")
+    print(f"{'views':<14} {', '.join(result['views'])}")
+
+    sys.path.insert(0, ROOT)
+    failures = check(result, {"first_run_ms": args.first_run_ms, "rerun_ms": args.rerun_ms, "switch_ms": args.switch_ms})
+    for line in failures: print("OVER BUDGET", line)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""離線用的 gspread 替身：試算表內容放在記憶體，每次 API 呼叫可加上固定延遲並計數。
+
+只實作 storage.py 用到的介面 (open / open_by_key / sheet1 / worksheet / get_worksheet / add_worksheet /
+values_batch_get / get_all_values / batch_update / batch_clear / add_rows / add_cols)。
+可模擬 Google 的錯誤回應：fail_next() 讓接下來幾次呼叫回傳 429 / 5xx，quota_per_minute 模擬每分鐘配額。
+"""
+import itertools
+import threading
+import time
+from collections import Counter, deque
+
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+class FakeResponse:
+    """APIError 需要的最小 response (status_code / text / json())。"""
+
+    def __init__(self, status):
+        self.status_code = status
+        self.text = "Quota exceeded for quota metric 'Read requests'" if status == 429 else "The service is currently unavailable."
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text,
+                          "status": "RESOURCE_EXHAUSTED" if self.status_code == 429 else "UNAVAILABLE"}}
+
+class FakeAPI:
+    """所有試算表共用的呼叫計數、延遲與錯誤注入設定；失敗的呼叫也計入 calls (與真實配額相同)。"""
+
+    def __init__(self, latency=0.0, quota_per_minute=None):
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.calls = Counter()
+        self.errors = Counter()
+        self._failures = deque()
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def fail_next(self, n=1, status=429):
+        with self._lock: self._failures.extend([status] * n)
+
+    def call(self, name):
+        with self._lock:
+            self.calls[name] += 1
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60: self._window.popleft()
+            status = self._failures.popleft() if self._failures else None
+            if status is None and self.quota_per_minute is not None and len(self._window) >= self.quota_per_minute: status = 429
+            if status != 429: self._window.append(now)
+            if status: self.errors[status] += 1
+        if self.latency: time.sleep(self.latency)
+        if status: raise APIError(FakeResponse(status))
+
+    def total(self):
+        with self._lock: return sum(self.calls.values())
+
+class FakeWorksheet:
+    _ids = itertools.count(1)
+
+    def __init__(self, book, title, rows=1000, cols=26):
+        self.book, self.api, self.title = book, book.api, title
+        self.row_count, self.col_count = rows, cols
+        self.id = next(self._ids)
+        self.spreadsheet_id = book.id
+        self.data = []
+
+    def _values(self):
+        rows = [["" if v is None else str(v) for v in r] for r in self.data]
+        while rows and not any(rows[-1]): rows.pop()
+        return rows
+
+    def get_all_values(self, **kwargs):
+        self.api.call("get_all_values")
+        return self._values()
+
+    def _put(self, a1, values):
+        grid = a1_range_to_grid_range(a1.split("!")[-1])
+        r0, c0 = grid.get("startRowIndex", 0), grid.get("startColumnIndex", 0)
+        for i, row in enumerate(values):
+            while len(self.data) <= r0 + i: self.data.append([])
+            line = self.data[r0 + i]
+            if len(line) < c0 + len(row): line.extend([""] * (c0 + len(row) - len(line)))
+            line[c0:c0 + len(row)] = ["" if v is None else v for v in row]
+
+    def batch_update(self, data, **kwargs):
+        self.api.call("batch_update")
+        for d in data: self._put(d["range"], d["values"])
+
+    def batch_clear(self, ranges):
+        self.api.call("batch_clear")
+        for a1 in ranges:
+            grid = a1_range_to_grid_range(a1.split("!")[-1])
+            for i in range(grid.get("startRowIndex", 0), min(grid.get("endRowIndex", len(self.data)), len(self.data))):
+                self.data[i] = [""] * len(self.data[i])
+
+    def add_rows(self, n):
+        self.api.call("add_rows")
+        self.row_count += n
+
+    def add_cols(self, n):
+        self.api.call("add_cols")
+        self.col_count += n
+
+class FakeSpreadsheet:
+    def __init__(self, api, title):
+        self.api, self.title, self.id = api, title, f"fake-{title}"
+        self.sheets = [FakeWorksheet(self, "工作表1")]
+
+    @property
+    def sheet1(self):
+        self.api.call("fetch_sheet_metadata")
+        return self.sheets[0]
+
+    def worksheet(self, title):
+        self.api.call("fetch_sheet_metadata")
+        for s in self.sheets:
+            if s.title == title: return s
+        raise WorksheetNotFound(title)
+
+    def get_worksheet(self, index):
+        self.api.call("fetch_sheet_metadata")
+        if index >= len(self.sheets): raise WorksheetNotFound(f"index {index} not found")
+        return self.sheets[index]
+
+    def add_worksheet(self, title, rows, cols):
+        self.api.call("add_worksheet")
+        sheet = FakeWorksheet(self, title, rows, cols)
+        self.sheets.append(sheet)
+        return sheet
+
+    def values_batch_get(self, ranges, params=None):
+        self.api.call("values_batch_get")
+        out = []
+        for a1 in ranges:
+            title = a1.split("!")[0].strip("'")
+            sheet = next(s for s in self.sheets if s.title == title)
+            out.append({"range": a1, "values": sheet._values()})
+        return {"valueRanges": out}
+
+class FakeClient:
+    def __init__(self, latency=0.0, quota_per_minute=None):
+        self.api = FakeAPI(latency, quota_per_minute)
+        self.books = {}
+
+    def open(self, title):
+        self.api.call("open")
+        return self.books.setdefault(title, FakeSpreadsheet(self.api, title))
+
+    def open_by_key(self, key):
+        self.api.call("open_by_key")
+        return next(b for b in self.books.values() if b.id == key)
+
+    def create_book(self, title, tables):
+        """tables: {"daily": rows, "gift": rows, ...}，依 storage.SHEET_TABS 的分頁順序建立。"""
+        book = FakeSpreadsheet(self.api, title)
+        book.sheets[0].data = [list(r) for r in tables.get("daily", [])]
+        for name, title_ in (("gift", "工作表2"), ("leave", "工作表3"), ("product", "工作表4")):
+            sheet = FakeWorksheet(book, title_, max(100, len(tables.get(name, []))), 26)
+            sheet.data = [list(r) for r in tables.get(name, [])]
+            book.sheets.append(sheet)
+        self.books[title] = book
+        return book
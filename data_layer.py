@@ -0,0 +1,604 @@
+import datetime
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import perf
+from archive import available as archive_available, configured as archive_configured, get_archive
+from datasets import SnapshotStore, frame_fingerprint
+from leave_expiry import LeaveExpiryIndex
+from pos_import import aggregate_exports
+from product_search import ProductIndex
+from schema import SCHEMAS
+from store_calendar import StoreCalendar
+from storage import TABLES, QUOTA_MESSAGE, get_storage, get_save_lock, save_rows, update_row, row_stamp, get_data_version, bump_data_version, is_rate_limited
+
+# app.py 與各頁面 (views/) 共用的資料層：行事曆、四張工作表的讀取 / 儲存 / 快照、KPI 彙總與 AI 指令。
+# 模組只在 process 第一次 import 時執行；Streamlit 每次重新執行的只有 app.py 與選到的頁面。
+
+# --- 1. 資料定義 (假日、行銷活動、新品檔期與每日目標見 data/calendar/*.json) ---
+@st.cache_resource(show_spinner=False)
+def get_calendar():
+    return StoreCalendar.load()
+
+@perf.cached(st.cache_data(show_spinner=False))
+def get_date_dimension(start, end, store=None, calendar_version=None):
+    """日期維度表 (顯示日期 / 星期 / 假日 / 月份 / ISO 週次 / 當日活動)，以日期為 index；行事曆檔案版本變動時重建。"""
+    return get_calendar().date_dimension(start, end, store)
+
+def get_event_info(date_input, store=None):
+    return get_calendar().event_text(date_input, store)
+
+# --- 2. 資料存取 (儲存後端見 storage.py) ---
+def show_load_error(e):
+    """讀取失敗時的提示；API 配額用盡 (重試後仍為 429) 時提示稍後重新讀取。"""
+    st.error(QUOTA_MESSAGE if is_rate_limited(e) else f"讀取錯誤: {e}")
+
+# --- 2.1 營運報表 (Sheet 1) ---
+def year_dates(year):
+    return pd.date_range(start=f"{year}-01-01", end=f"{year}-12-31", freq="D").date
+
+def initialize_sheet(sheet_name, year=None):
+    """空白的營運報表建立 year (預設為今年) 整年度的日期列。"""
+    year = year or datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=8))).year
+    rows = SCHEMAS["daily"].to_rows(pd.DataFrame({"日期": year_dates(year)}))
+    get_storage().write_table(sheet_name, "daily", rows)
+    return rows
+
+def store_of(sheet_name):
+    """試算表對應的門市名稱 (門市清單中沒有時為 None，只套用不限門市的活動)。"""
+    return next((s["name"] for s in load_store_registry() if s["sheet"] == sheet_name), None)
+
+def parse_daily_records(rows, store=None):
+    """將營運報表 (含標題列的二維列表) 依 schema 轉型並併入日期維度表 (含 store 限定的活動)；沒有「日期」欄或沒有資料列時回傳 None。"""
+    if len(rows) < 2 or "日期" not in rows[0]: return None
+    df = SCHEMAS["daily"].parse(rows)
+    dim = get_date_dimension(df["日期"].min(), df["日期"].max(), store, get_calendar().version)
+    return df.merge(dim, on="日期", how="left")
+
+def build_daily_df(sheet_name, data):
+    try:
+        df = parse_daily_records(data, store_of(sheet_name))
+        if df is None: df = parse_daily_records(initialize_sheet(sheet_name), store_of(sheet_name))
+        return df
+    except Exception as e:
+        st.error(f"讀取錯誤: {e}")
+        return pd.DataFrame()
+
+def load_data(sheet_name):
+    try:
+        return load_all_data(sheet_name, get_sheet_versions(sheet_name))["daily"]
+    except Exception as e:
+        show_load_error(e)
+        return pd.DataFrame()
+
+def save_table(sheet_name, table, base_df, df):
+    """條件式儲存 (見 storage.save_rows)：只寫入 df 相對於 base_df 改過的列 (兩者可以只含部分列)。
+
+    後端合併後的內容直接成為新版本的共用快照，其他 session 不必重新讀取；回傳 (新快照, 資料版本)。
+    其他人同時改過、自己也改了的列保留對方的版本，並留下提示於下次執行時顯示。
+    """
+    with perf.span(f"save.{table}", sheet=sheet_name, rows=len(df)):
+        # 版本號在儲存鎖內遞增，確保較新的版本一定含有較早儲存的內容
+        with get_save_lock():
+            rows, conflicts = save_rows(sheet_name, table, SCHEMAS[table].to_rows(base_df), SCHEMAS[table].to_rows(df))
+            version = bump_data_version(sheet_name, table)
+        frame = get_snapshot_store().publish((sheet_name, table), version, build_table(sheet_name, table, rows))
+    if conflicts:
+        keys = "、".join(" / ".join(k) for k in conflicts[:10]) + (" …" if len(conflicts) > 10 else "")
+        st.session_state.save_conflicts = f"⚠️ 有 {len(conflicts)} 筆資料在你編輯期間已被其他人修改，已保留對方的版本：{keys}。請確認後再修改。"
+    return frame, version
+
+def save_data_to_sheet(sheet_name, base_df, df):
+    try:
+        saved = save_table(sheet_name, "daily", base_df, df)
+        st.toast("✅ 營運數據已更新！", icon="💾")
+        return saved
+    except Exception as e:
+        st.error(f"儲存失敗: {e}")
+
+def merge_daily_edits(df, edited_kpi, edited_prod, edited_special, edited_delivery, edited_labor):
+    """以「日期」對齊，一次套用五個編輯表的變更，並以欄位向量運算重算 PSD達成率 / AT / 貢獻度。"""
+    base = df.set_index(pd.DatetimeIndex(pd.to_datetime(df["日期"])))
+    editors = [
+        (edited_kpi, ['目標PSD', '實績PSD', 'ADT', '備註']),
+        (edited_prod, ['糕點PSD', '糕點USD', '糕點報廢USD', 'Retail', 'CB', '現烤', 'BAF', '節慶USD']),
+        (edited_special, ['三星蔥寶寶', '竹筍寶寶', '車掌造型娃包', '車長冷水壺', '木紋不鏽鋼杯']),
+        (edited_delivery, ['foodpanda', 'foodomo', 'MOP']),
+        (edited_labor, ['日工時', 'IPLH']),
+    ]
+    touched = []
+    for edited, cols in editors:
+        upd = edited.set_index(pd.DatetimeIndex(pd.to_datetime(edited["日期"])))[cols]
+        upd = upd[upd.index.isin(base.index) & ~upd.index.duplicated(keep="last")]
+        for c in cols:
+            if pd.api.types.is_numeric_dtype(base[c]) and pd.api.types.is_numeric_dtype(upd[c]) and base[c].dtype != upd[c].dtype:
+                base[c] = base[c].astype(np.result_type(base[c].dtype, upd[c].dtype))
+            base.loc[upd.index, c] = upd[c]
+        touched.append(upd.index)
+    return recompute_daily_metrics(base, touched[0], touched[-1]).reset_index(drop=True)
+
+def recompute_daily_metrics(base, kpi_idx, labor_idx):
+    """就地重算 kpi_idx 列的 PSD達成率 / AT 與 labor_idx 列的貢獻度 (欄位向量運算)；回傳 base。"""
+    actual = base.loc[kpi_idx, "實績PSD"].fillna(0).to_numpy(dtype=float)
+    target = base.loc[kpi_idx, "目標PSD"].fillna(0).to_numpy(dtype=float)
+    adt = base.loc[kpi_idx, "ADT"].fillna(0).to_numpy(dtype=float)
+    base.loc[kpi_idx, "PSD達成率"] = np.round(actual / np.where(target > 0, target, 1.0) * 100, 1).astype(base["PSD達成率"].dtype)
+    base.loc[kpi_idx, "AT"] = np.where(adt > 0, np.round(actual / np.where(adt > 0, adt, 1.0)), 0).astype(base["AT"].dtype)
+
+    psd = base.loc[labor_idx, "實績PSD"].fillna(0).to_numpy(dtype=float)
+    hours = base.loc[labor_idx, "日工時"].fillna(0).to_numpy(dtype=float)
+    base.loc[labor_idx, "貢獻度"] = np.where(hours > 0, np.trunc(psd / np.where(hours > 0, hours, 1.0)), 0).astype(base["貢獻度"].dtype)
+    return base
+
+# KPI 彙總：全期加總的欄位，與只在「有業績的日子」取日平均的欄位
+KPI_TOTALS = ['實績PSD', '目標PSD', 'ADT', '日工時', 'foodpanda', 'foodomo', 'MOP']
+KPI_DAILY_MEANS = ['ADT', '糕點PSD', '糕點USD', '糕點報廢USD', 'CB', '現烤', 'Retail']
+# 每一層都以「年」開頭：多年度的營運報表 (或歷史封存) 不會把不同年份的同一月份加在一起
+KPI_LEVELS = {"month": ["Year", "Month"], "week": ["Year", "Month", "Week_Num"], "day": ["Year", "Month", "日期"]}
+
+def _kpi_parts(frame):
+    valid = frame["實績PSD"] > 0
+    parts = frame[KPI_TOTALS].copy()
+    for c in KPI_DAILY_MEANS: parts[f"valid_{c}"] = frame[c].where(valid, 0)
+    parts["valid_days"] = valid.astype(int)
+    parts["start"] = frame["日期"]
+    parts["end"] = frame["日期"]
+    agg = {c: "sum" for c in parts.columns}
+    agg.update(start="min", end="max")
+    return parts, agg
+
+def _kpi_rollup(frame, keys):
+    parts, agg = _kpi_parts(frame)
+    return parts.groupby([frame[k] for k in keys]).agg(agg)
+
+def build_kpi_cube(df):
+    """營運報表的日 / 週 / 月 KPI 彙總表 (各欄位加總、有業績天數、起訖日)。"""
+    return {level: _kpi_rollup(df, keys) for level, keys in KPI_LEVELS.items()}
+
+def get_kpi_cube(sheet_name, version, df):
+    """資料版本對應的 KPI 彙總表，與營運報表快照一樣由所有 session 共用。"""
+    # 同一版本的快照過期重建後內容可能不同 (直接在試算表上的修改)，以內容指紋區分
+    return get_snapshot_store().get((sheet_name, "kpi_cube"), (version, frame_fingerprint(df)), lambda: build_kpi_cube(df))
+
+def _year_month(year, month):
+    return year * 100 + month
+
+def update_kpi_cube(cube, df, dates):
+    """只重算 dates 所在 (年, 月) 的彙總列，其餘月份沿用原本的 cube。"""
+    year_month = _year_month(df["Year"], df["Month"])
+    months = year_month[df["日期"].isin(set(dates))].unique()
+    if len(months) == 0: return cube
+    sub = df[year_month.isin(months)]
+    updated = {}
+    for level, keys in KPI_LEVELS.items():
+        old = cube[level]
+        keep = old[~_year_month(old.index.get_level_values("Year"), old.index.get_level_values("Month")).isin(months)]
+        updated[level] = pd.concat([keep, _kpi_rollup(sub, keys)]).sort_index()
+    return updated
+
+def publish_kpi_cube(sheet_name, old_version, old_df, df, version):
+    """儲存後以舊版本的彙總表只重算有變動的月份，作為新版本的共用彙總表 (存檔結果的日期與舊版本不同時，留待讀取時重建)。"""
+    if df.empty or df["日期"].tolist() != old_df["日期"].tolist(): return
+    cols = KPI_TOTALS + KPI_DAILY_MEANS
+    changed = df.loc[df[cols].ne(old_df[cols]).any(axis=1), "日期"]
+    cube = update_kpi_cube(get_kpi_cube(sheet_name, old_version, old_df), df, changed)
+    get_snapshot_store().publish((sheet_name, "kpi_cube"), (version, frame_fingerprint(df)), cube)
+
+def month_target(store, year, month):
+    """門市整月的業績目標 = 行事曆的每日目標 PSD x 當月天數 (每日營運報表的「全月累計」與區域總覽共用)。"""
+    calendar = get_calendar()
+    return calendar.target_psd(store, year, month) * calendar.days_in_month(year, month)
+
+def kpis_from_totals(t, total_target):
+    """由一列彙總值算出核心績效看板與區域總覽共用的 KPI。"""
+    days_count = max(int(t["valid_days"]), 1)
+    total_sales, total_adt, total_labor = t["實績PSD"], t["ADT"], t["日工時"]
+    total_panda, total_fdm, total_mop = t["foodpanda"], t["foodomo"], t["MOP"]
+    return {
+        "total_sales": total_sales,
+        "total_target": total_target,
+        "achieve_rate": (total_sales / total_target * 100) if total_target > 0 else 0,
+        "days_count": days_count,
+        "valid_days": int(t["valid_days"]),
+        "avg_psd": total_sales / days_count,
+        "avg_adt": t["valid_ADT"] / days_count,
+        "avg_at": total_sales / total_adt if total_adt > 0 else 0,
+        "avg_contrib": (total_sales / total_labor) if total_labor > 0 else 0,
+        "avg_panda": total_panda / days_count,
+        "avg_fdm": total_fdm / days_count,
+        "avg_mop": total_mop / days_count,
+        "avg_delivery_total": (total_panda + total_fdm + total_mop) / days_count,
+        "daily_means": {c: t[f"valid_{c}"] / days_count for c in KPI_DAILY_MEANS},
+    }
+
+def summarize_kpis(frame, total_target):
+    parts, agg = _kpi_parts(frame)
+    return kpis_from_totals(parts.agg(agg), total_target)
+
+# AI 營運顧問指令：逐日明細以欄位字串運算產生；超過字數上限時，較早的週次改為一行週摘要
+AI_PROMPT_BUDGET = 8000
+AI_PROMPT_FORMAT = "(格式：日期: 業績 /達成率/ 來客 | 客單 /糕點PSD/USD/報廢/Retail/CB/現烤/BAF/節慶 | 效率:工時/貢獻/IPLH | 外送:熊貓/FDM/MOP, 活動：名稱)"
+AI_PROMPT_ASK = "請分析活動效益、業績缺口原因以及外送機會點，並針對「人力工時與貢獻度」給予排班建議。"
+
+def _fmt(series, spec):
+    return series.map(("{:" + spec + "}").format)
+
+def format_prompt_lines(detail, events):
+    """每天一行的明細字串 (與 detail 同 index)。"""
+    sales, target = detail["實績PSD"], detail["目標PSD"]
+    rate = (sales / target.where(target > 0) * 100).fillna(0)
+    s = lambda c: detail[c].astype(str)
+    return (
+        pd.Series([d.strftime("%m/%d") for d in detail["日期"]], index=detail.index)
+        + ": 業績$" + _fmt(sales, ",.0f") + " /每日目標達成" + _fmt(rate, ".1f") + "%/ 來客" + s("ADT") + " | "
+        + "客單$" + s("AT") + " /糕點PSD$" + _fmt(detail["糕點PSD"], ",.0f") + "/USD" + s("糕點USD") + "/"
+        + "報廢" + s("糕點報廢USD") + "/Retail$" + _fmt(detail["Retail"], ",.0f") + "/"
+        + "CB" + s("CB") + "/現烤$" + _fmt(detail["現烤"], ",.0f") + "/BAF" + s("BAF") + "/節慶$" + s("節慶USD") + " | "
+        + "效率:工時" + _fmt(detail["日工時"], ".1f") + "hr/貢獻$" + s("貢獻度") + "/IPLH" + _fmt(detail["IPLH"], ".1f") + " | "
+        + "外送:熊貓$" + s("foodpanda") + "/FDM$" + s("foodomo") + "/MOP$" + s("MOP") + ", "
+        + "活動：" + events.replace("", "無")
+    )
+
+def format_week_summaries(detail, events, week):
+    """每週一行的摘要字串 (以週次為 index)，供超過字數上限時取代較早的逐日明細。"""
+    grouped = detail.assign(_evt=events).groupby(week, sort=True)
+    agg = grouped.agg(start=("日期", "min"), end=("日期", "max"), days=("日期", "size"), sales=("實績PSD", "sum"),
+                      target=("目標PSD", "sum"), adt=("ADT", "sum"), labor=("日工時", "sum"),
+                      panda=("foodpanda", "sum"), fdm=("foodomo", "sum"), mop=("MOP", "sum"))
+    evts = grouped["_evt"].agg(lambda e: "、".join(dict.fromkeys(n for x in e for n in x.split(" | ") if n)) or "無")
+    rate = (agg["sales"] / agg["target"].where(agg["target"] > 0) * 100).fillna(0)
+    contrib = (agg["sales"] / agg["labor"].where(agg["labor"] > 0)).fillna(0)
+    return (
+        "[週摘要] " + pd.Series([d.strftime("%m/%d") for d in agg["start"]], index=agg.index)
+        + "~" + pd.Series([d.strftime("%m/%d") for d in agg["end"]], index=agg.index)
+        + " (" + agg["days"].astype(str) + "天): 業績$" + _fmt(agg["sales"], ",.0f") + " /達成" + _fmt(rate, ".1f")
+        + "%/ 來客" + agg["adt"].astype(str) + " | 效率:工時" + _fmt(agg["labor"], ".1f") + "hr/貢獻$" + _fmt(contrib, ",.0f")
+        + " | 外送:熊貓$" + agg["panda"].astype(str) + "/FDM$" + agg["fdm"].astype(str) + "/MOP$" + agg["mop"].astype(str)
+        + ", 活動：" + evts
+    )
+
+@perf.cached(st.cache_data(ttl=60, show_spinner=False))
+def build_ai_prompt(_frame, data_version, store, period, period_str, total_target, budget=AI_PROMPT_BUDGET):
+    """組出 AI 營運顧問指令；依 (資料版本, 門市, 區間, 模式, 字數上限) 快取，_frame 不參與快取鍵。
+
+    全部逐日明細放得下就原樣輸出；否則從最早的週次開始改成週摘要，仍超過上限時再略過最早的週摘要。
+    """
+    head = f"""我是星巴克{store}的店經理，請協助分析數據。\n【分析區間】：{period_str} (總目標：{total_target:,})\n\n【詳細數據】：\n{AI_PROMPT_FORMAT}\n"""
+    tail = "\n\n" + AI_PROMPT_ASK
+    detail = _frame[_frame["實績PSD"] > 0].sort_values("日期")
+    if detail.empty: return head + "(尚無資料)" + tail
+
+    dim = get_date_dimension(detail["日期"].min(), detail["日期"].max(), store, get_calendar().version)
+    events = pd.Series(dim["當日活動"].reindex(detail["日期"]).fillna("").to_numpy(), index=detail.index)
+    lines = format_prompt_lines(detail, events)
+    room = budget - len(head) - len(tail)
+    if (lines.str.len() + 1).sum() <= room: return head + "".join(lines + "\n") + tail
+
+    week = detail["日期"].map(lambda d: d.isocalendar()[:2])
+    weeks = list(dict.fromkeys(week))
+    summaries = format_week_summaries(detail, events, week)
+    day_cost = (lines.str.len() + 1).groupby(week).sum().reindex(weeks).to_numpy()
+    summary_cost = (summaries.str.len() + 1).reindex(weeks).to_numpy()
+    # cut 之前的週改用摘要：找出放得下的最小 cut
+    cost = [summary_cost[:cut].sum() + day_cost[cut:].sum() for cut in range(len(weeks) + 1)]
+    cut = next((c for c, total in enumerate(cost) if total <= room), len(weeks))
+    keep = summaries.reindex(weeks[:cut])
+    dropped = 0
+    while len(keep) and (keep.str.len() + 1).sum() + day_cost[cut:].sum() > room:
+        keep, dropped = keep.iloc[1:], dropped + 1
+    body = ("(更早 %d 週已省略)\n" % dropped if dropped else "") + "".join(keep + "\n") + "".join(lines[week.isin(weeks[cut:])] + "\n")
+    return head + body + tail
+
+# --- 2.2 禮盒控管 (Sheet 2) ---
+# 每個禮盒以 (檔期, 品項) 為鍵 (schema 的 keys)；整表編輯與單品項加減都以鍵值對齊，不依列的位置
+def gift_progress(original, remaining):
+    """銷售進度 (%) = 已售 / 原始控量；原始控量為 0 時為 0。"""
+    return ((original - remaining) / original.where(original > 0) * 100).fillna(0)
+
+def build_gift_df(rows):
+    try:
+        df = SCHEMAS["gift"].parse(rows)
+        df['銷售進度'] = gift_progress(df['原始控量'], df['剩餘控量'])
+        return df
+    except Exception as e:
+        return SCHEMAS["gift"].empty().assign(銷售進度=0.0)
+
+def load_gift_data(sheet_name):
+    try:
+        return load_all_data(sheet_name, get_sheet_versions(sheet_name))["gift"]
+    except Exception as e:
+        # 讀取失敗時停在錯誤訊息，不以空表繼續 (否則看起來像沒有資料，還可能被當成空表編輯)
+        show_load_error(e)
+        st.stop()
+
+def save_gift_data(sheet_name, base_df, df):
+    try:
+        save_table(sheet_name, "gift", base_df, df)
+        st.toast("✅ 禮盒庫存已更新！", icon="🎁")
+    except Exception as e:
+        st.error(f"禮盒儲存失敗: {e}")
+
+def adjust_gift_stock(sheet_name, season, item, delta):
+    """單一禮盒的剩餘控量加減 delta (賣出為負數)：只寫入該品項的「剩餘控量」一格，共用快照也只重算這一列的銷售進度。
+
+    讀取、檢查與寫入都在儲存鎖內完成，多人同時扣量不會互相覆蓋；結果不可低於 0 或超過原始控量。
+    回傳更新後的剩餘控量，失敗時顯示錯誤並回傳 None。
+    """
+    def apply(row):
+        remaining = int(float(row["剩餘控量"] or 0)) + delta
+        if not 0 <= remaining <= int(float(row["原始控量"] or 0)):
+            raise ValueError(f"剩餘 {row['剩餘控量']} 盒 (原始控量 {row['原始控量']} 盒)，無法調整 {delta:+d} 盒")
+        return {"剩餘控量": remaining}
+
+    try:
+        with perf.span("save.gift_adjust", sheet=sheet_name, delta=delta), get_save_lock():
+            previous = get_snapshot_store().peek((sheet_name, "gift"), get_data_version(sheet_name, "gift"))
+            rows, row = update_row(sheet_name, "gift", (season, item), apply)
+            version = bump_data_version(sheet_name, "gift")
+            hit = (previous["檔期"] == season) & (previous["品項"] == item) if previous is not None else None
+            if hit is not None and hit.sum() == 1 and len(previous) == len(rows) - 1:
+                frame = previous.copy()
+                frame.loc[hit, "剩餘控量"] = row["剩餘控量"]
+                frame.loc[hit, "銷售進度"] = gift_progress(frame.loc[hit, "原始控量"], frame.loc[hit, "剩餘控量"])
+            else:
+                frame = build_table(sheet_name, "gift", rows)
+            get_snapshot_store().publish((sheet_name, "gift"), version, frame)
+        return row["剩餘控量"]
+    except KeyError as e:
+        st.error(f"找不到禮盒：{e.args[0]}")
+    except Exception as e:
+        st.error(f"禮盒庫存調整失敗: {e}")
+
+# --- 2.3 夥伴休假管理 (Sheet 3) ---
+def build_leave_df(rows):
+    try: return SCHEMAS["leave"].parse(rows)
+    except Exception as e: return SCHEMAS["leave"].empty()
+
+def load_leave_data(sheet_name):
+    try:
+        return load_all_data(sheet_name, get_sheet_versions(sheet_name))["leave"]
+    except Exception as e:
+        show_load_error(e)
+        st.stop()
+
+def get_leave_index(sheet_name):
+    """休假到期索引 (週期字串一次解析、依到期日排序)；以休假表內容的指紋快取，直接在試算表上的修改於快照重讀後也會反映。"""
+    df = load_leave_data(sheet_name)
+    return build_leave_index(frame_fingerprint(df), df)
+
+@perf.cached(st.cache_resource(show_spinner=False, max_entries=8))
+def build_leave_index(fingerprint, _df):
+    return LeaveExpiryIndex(_df)
+
+def save_leave_data(sheet_name, base_df, df):
+    try:
+        save_table(sheet_name, "leave", base_df, df)
+        st.toast("✅ 休假資料已更新！", icon="👥")
+    except Exception as e:
+        st.error(f"休假儲存失敗: {e}")
+
+# --- 2.4 商品資料庫 (Sheet 4) ---
+def build_product_df(rows):
+    try: return SCHEMAS["product"].parse(rows)
+    except Exception as e: return SCHEMAS["product"].empty()
+
+def load_product_data(sheet_name):
+    try:
+        return load_all_data(sheet_name, get_sheet_versions(sheet_name))["product"]
+    except Exception as e:
+        show_load_error(e)
+        st.stop()
+
+def get_product_index(sheet_name):
+    """商品搜尋索引 (品名 n-gram、品號前綴、檔期 facet)；以目錄內容的指紋快取，直接在試算表上的修改於快照重讀後也會反映。
+    回傳 (目錄 DataFrame, ProductIndex)。
+    """
+    df = load_product_data(sheet_name)
+    return df, build_product_index(frame_fingerprint(df), df)
+
+@perf.cached(st.cache_resource(show_spinner=False, max_entries=8))
+def build_product_index(fingerprint, _df):
+    return ProductIndex(_df)
+
+# --- 2.5 一次讀取四張工作表 (process 共用的唯讀快照) ---
+@st.cache_resource(show_spinner=False)
+def get_snapshot_store():
+    """各試算表、各資料表、各資料版本的 DataFrame 快照，所有 session 參考同一份 (不像 st.cache_data 每次回傳複本)。"""
+    return SnapshotStore(keep=2, ttl=60)
+
+def get_sheet_versions(sheet_name):
+    return tuple(get_data_version(sheet_name, key) for key in TABLES)
+
+def build_table(sheet_name, table, rows):
+    with perf.span(f"parse.{table}", rows=max(len(rows) - 1, 0)):
+        if table == "daily": return build_daily_df(sheet_name, rows)
+        return {"gift": build_gift_df, "leave": build_leave_df, "product": build_product_df}[table](rows)
+
+def load_all_data(sheet_name, versions):
+    """四張工作表的共用快照 {資料表: DataFrame}；versions 為各工作表的資料版本。
+
+    沒有快照 (或已過期) 的工作表由儲存後端一次讀取 (Google 試算表為一次 values_batch_get) 並解析。
+    回傳的 DataFrame 由所有 session 共用，呼叫端不可就地修改。
+    """
+    def fetch(keys):
+        data = get_storage().read_tables(sheet_name, [t for _, t in keys])
+        frames = {(sheet_name, t): build_table(sheet_name, t, data.get(t, [])) for _, t in keys}
+        # 營運報表解析失敗 (空表) 不留快照，下次重新讀取並再次顯示錯誤
+        if (sheet_name, "daily") in frames and frames[(sheet_name, "daily")].empty: frames[(sheet_name, "daily")] = None
+        return frames
+
+    with perf.span("snapshot.load", sheet=sheet_name) as attrs:
+        store = get_snapshot_store()
+        wanted = {(sheet_name, t): v for t, v in zip(TABLES, versions)}
+        attrs["missing"] = sum(store.peek(k, v) is None for k, v in wanted.items())
+        frames = store.get_many(sheet_name, wanted, fetch)
+    perf.count("cache_hit.snapshot", len(TABLES) - attrs["missing"])
+    if attrs["missing"]: perf.count("cache_miss.snapshot", attrs["missing"])
+    return {t: pd.DataFrame() if frames[(sheet_name, t)] is None else frames[(sheet_name, t)] for t in TABLES}
+
+# --- 2.6 門市清單與區域彙整 ---
+@st.cache_resource(show_spinner=False)
+def load_store_registry():
+    """讀取 data/stores.json 的門市清單：[{"name": 門市名稱, "sheet": 試算表名稱}, ...]。"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "stores.json"), encoding="utf-8") as f:
+        return json.load(f)["stores"]
+
+@perf.cached(st.cache_resource(ttl=60, show_spinner=False, max_entries=4))
+def load_region_data(stores, versions):
+    """以執行緒池同時讀取各門市的營運報表與休假表 (每店一次批次讀取) 並合併 (加上「門市」欄)；
+    stores 為 ((門市, 試算表), ...)，versions 為各店 (營運報表, 休假表) 的資料版本。
+
+    結果由所有 session 共用 (cache_resource，不複製)，呼叫端不可就地修改。
+
+    回傳 (合併後的營運報表, 全區夥伴的休假到期索引, {門市: 錯誤訊息})。尚未建立營運報表的門市略過，不會替它初始化。
+    """
+    storage = get_storage()
+    def fetch(name, sheet_name):
+        data = storage.read_tables(sheet_name, ("daily", "leave"))
+        return parse_daily_records(data["daily"], name), build_leave_df(data["leave"])
+
+    frames, rosters, errors = [], [], {}
+    with ThreadPoolExecutor(max_workers=max(1, min(16, len(stores)))) as pool:
+        futures = [(name, pool.submit(fetch, name, sheet_name)) for name, sheet_name in stores]
+        for name, future in futures:
+            try: df, leave = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+                continue
+            if df is not None: frames.append(df.assign(門市=name))
+            rosters.append(leave.assign(門市=name))
+    region_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    roster = pd.concat(rosters, ignore_index=True) if rosters else SCHEMAS["leave"].empty().assign(門市="")
+    return region_df, LeaveExpiryIndex(roster), errors
+
+# --- 2.7 歷史封存與去年同期比較 (封存格式見 archive.py) ---
+YOY_COLUMNS = ["實績PSD", "ADT"]
+
+def closed_months(df, today):
+    """營運報表中可以封存的 [(年, 月), ...]：今天所在月份之前的月份，但表中最後一個月一定保留。"""
+    if df.empty: return []
+    months = sorted({(d.year, d.month) for d in df["日期"]})
+    return [m for m in months[:-1] if m < (today.year, today.month)]
+
+def archived_months(sheet_name):
+    return get_archive().months(sheet_name) if archive_available() else []
+
+def add_year(sheet_name, year):
+    """營運報表補上 year 年度還沒有的日期列 (已封存的月份除外)；回傳新增的天數，失敗時回傳 None。"""
+    try:
+        df = load_data(sheet_name)
+        existing, archived = set(df["日期"]), set(archived_months(sheet_name))
+        new = pd.DataFrame({"日期": [d for d in year_dates(year) if d not in existing and (d.year, d.month) not in archived]})
+        if not new.empty: save_table(sheet_name, "daily", new.iloc[:0], new)
+        st.toast(f"✅ 已建立 {year} 年度 {len(new)} 天", icon="📅")
+        return len(new)
+    except Exception as e:
+        st.error(f"建立年度資料失敗: {e}")
+
+def verify_archived(sheet_name, closed):
+    """封存檔讀回的全部欄位與 closed 逐日比對 (數值依 row_stamp 正規化)；有缺少或不符的日子時丟出 RuntimeError。"""
+    schema = SCHEMAS["daily"]
+    stored = get_archive().read(sheet_name, closed["日期"].min(), closed["日期"].max())
+    day = schema.names.index("日期")
+    found = {r[day]: row_stamp(r) for r in schema.to_rows(stored)[1:]}
+    bad = [r[day] for r in schema.to_rows(closed)[1:] if found.get(r[day]) != row_stamp(r)]
+    if bad: raise RuntimeError(f"封存檔核對不符 ({len(bad)} 天，例如 {bad[0]})，營運報表未刪除任何資料")
+
+def archive_closed_months(sheet_name, today):
+    """已結束的月份寫入歷史封存、讀回核對全部欄位後才從營運報表刪除；回傳封存的 [(年, 月), ...]，失敗時回傳 None。
+
+    刪除經過條件式儲存：封存期間別人改過的列留在營運報表 (並提示衝突)，下次封存時以新內容覆蓋封存檔中的同一天。
+    沒有明確設定封存路徑時不封存 (見 archive.py)。
+    """
+    try:
+        if not archive_configured(): raise RuntimeError("尚未設定封存路徑 (ARCHIVE_PATH 或 secrets 的 [archive] path)，營運報表未刪除任何資料")
+        df = load_data(sheet_name)
+        months = closed_months(df, today)
+        if not months: return []
+        month_key = pd.Series([(d.year, d.month) for d in df["日期"]], index=df.index)
+        closed = df[month_key.isin(months)]
+        with perf.span("archive.closed_months", sheet=sheet_name, months=len(months)):
+            for (year, month), part in closed.groupby(month_key[closed.index]): get_archive().write_month(sheet_name, year, month, part)
+            verify_archived(sheet_name, closed)
+            bump_data_version(sheet_name, "archive")
+            save_table(sheet_name, "daily", closed, closed.iloc[:0])
+        st.toast(f"✅ 已封存 {len(months)} 個月份", icon="🗄️")
+        return months
+    except Exception as e:
+        st.error(f"封存失敗: {e}")
+
+@perf.cached(st.cache_data(ttl=600, show_spinner=False, max_entries=32))
+def load_history(sheet_name, start, end, columns=None, archive_version=0):
+    """歷史封存中 start~end 的營運報表併入日期維度；只讀取涵蓋區間的分區與 columns 欄位 (tuple，None 為全部)。"""
+    df = get_archive().read(sheet_name, start, end, columns)
+    if df.empty: return df
+    return df.merge(get_date_dimension(start, end, store_of(sheet_name), get_calendar().version), on="日期", how="left")
+
+def _same_day_last_year(d):
+    try: return d.replace(year=d.year - 1)
+    except ValueError: return d.replace(year=d.year - 1, day=28)  # 2/29
+
+def compare_last_year(sheet_name, frame):
+    """frame 中有業績的日子對上去年同一天、以及 364 天前 (同一個星期幾) 的業績與來客加總。
+
+    回傳 {"current" / "same_date" / "same_weekday": 加總, "matched_date" / "matched_weekday": 對得到的天數}；
+    沒有封存資料時回傳 None。
+    """
+    days = frame.loc[frame["實績PSD"] > 0, ["日期"] + YOY_COLUMNS]
+    if days.empty or not archive_available(): return None
+    same_date = [_same_day_last_year(d) for d in days["日期"]]
+    same_weekday = [d - datetime.timedelta(days=364) for d in days["日期"]]
+    history = load_history(sheet_name, min(same_date + same_weekday), max(same_date + same_weekday),
+                           ("日期", *YOY_COLUMNS), get_data_version(sheet_name, "archive"))
+    if history.empty: return None
+    history = history.set_index("日期")[YOY_COLUMNS]
+    by_date, by_weekday = history.reindex(same_date), history.reindex(same_weekday)
+    return {"current": days[YOY_COLUMNS].sum(), "same_date": by_date.sum(), "same_weekday": by_weekday.sum(),
+            "matched_date": int(by_date["實績PSD"].notna().sum()), "matched_weekday": int(by_weekday["實績PSD"].notna().sum())}
+
+# --- 2.8 POS / 外送平台匯出檔匯入 (讀取與欄位對應見 pos_import.py) ---
+def apply_daily_totals(sheet_name, totals):
+    """逐日彙總 (以日期為 index、只含匯出檔有的欄位) 套用到營運報表：只覆寫有值的欄位，重算 PSD達成率 / AT / 貢獻度，
+    再條件式儲存這些日期 (只寫入實際變動的列)。營運報表沒有的日期 (其他年度、已封存的月份) 略過。回傳 (更新天數, 略過天數)。
+    """
+    df = load_data(sheet_name)
+    if df.empty: raise RuntimeError("營運報表讀取失敗")
+    base = df.set_index(pd.DatetimeIndex(pd.to_datetime(df["日期"])))
+    upd = totals[totals.index.isin(base.index)]
+    before = base.loc[upd.index]
+    after = before.copy()
+    for c in upd.columns:
+        values = upd[c].dropna()
+        if values.empty: continue
+        if pd.api.types.is_integer_dtype(after[c]) and not ((values % 1) == 0).all(): after[c] = after[c].astype(float)
+        after.loc[values.index, c] = values.astype(after[c].dtype)
+    recompute_daily_metrics(after, after.index, after.index)
+    if len(upd): save_table(sheet_name, "daily", before.reset_index(drop=True), after.reset_index(drop=True))
+    return len(upd), len(totals) - len(upd)
+
+def import_pos_exports(files, store_choice, current_sheet):
+    """POS / 外送平台匯出檔 [(檔名, 檔案), ...] 逐段讀取、依門市與日期加總後寫入各門市的營運報表。
+
+    沒有「門市」欄的列歸到目前的門市，其他依門市清單 (門市名稱或試算表名稱) 對應。
+    回傳 {"stores": {門市: (更新天數, 略過天數)}, "unknown": 對應不到的門市, **讀取統計}；失敗時顯示錯誤並回傳 None。
+    """
+    try:
+        totals, stats = aggregate_exports(files)
+        sheets = {"": (store_choice, current_sheet)}
+        for s in load_store_registry(): sheets[s["name"]] = sheets[s["sheet"]] = (s["name"], s["sheet"])
+        report = dict(stats, stores={}, unknown=[])
+        with perf.span("import.apply", stores=totals.index.get_level_values(0).nunique()):
+            for store, part in totals.groupby(level=0, sort=False):
+                if store not in sheets:
+                    report["unknown"].append(store)
+                    continue
+                name, sheet_name = sheets[store]
+                report["stores"][name] = apply_daily_totals(sheet_name, part.droplevel(0))
+        return report
+    except Exception as e:
+        st.error(f"匯入失敗: {e}")
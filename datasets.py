@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import time
+
+import pandas as pd
+
+class SnapshotStore:
+    """process 共用的唯讀資料快照：每個 key (試算表, 資料表) 保留最近 keep 個資料版本，所有 session 參考同一個物件、不複製。
+
+    快照建立後不可就地修改 (pandas copy-on-write 下，切片與衍生的 DataFrame 不會影響快照)；
+    同一版本超過 ttl 秒視為過期，下次讀取時重建，以便看到直接在試算表上的修改。
+    """
+
+    def __init__(self, keep=2, ttl=60):
+        self.keep, self.ttl = keep, ttl
+        self._lock = threading.Lock()
+        self._snapshots = {}   # key -> {version: (建立時間, 值)}
+        self._building = {}    # group -> Lock，同一組快照並行缺少時只建一次
+
+    def peek(self, key, version):
+        """回傳未過期的快照；沒有時回傳 None。"""
+        with self._lock:
+            entry = self._snapshots.get(key, {}).get(version)
+        if entry and time.monotonic() - entry[0] < self.ttl: return entry[1]
+        return None
+
+    def get_many(self, group, versions, build):
+        """versions: {key: 版本}；缺少的 key 一次交給 build(缺少的 key 清單) -> {key: 值} 建立 (值為 None 時不保存)。回傳 {key: 值}。"""
+        values = {k: self.peek(k, v) for k, v in versions.items()}
+        if all(v is not None for v in values.values()): return values
+        with self._lock: building = self._building.setdefault(group, threading.Lock())
+        with building:
+            values = {k: self.peek(k, v) for k, v in versions.items()}
+            missing = [k for k, v in values.items() if v is None]
+            if missing:
+                for k, value in build(missing).items(): values[k] = value if value is None else self.publish(k, versions[k], value)
+        return values
+
+    def get(self, key, version, build):
+        return self.get_many(key, {key: version}, lambda missing: {key: build()})[key]
+
+    def publish(self, key, version, value):
+        """放入 (或取代) 某個版本的快照，只保留最新的 keep 個版本。"""
+        with self._lock:
+            versions = self._snapshots.setdefault(key, {})
+            versions[version] = (time.monotonic(), value)
+            for old in sorted(versions)[:-self.keep]: del versions[old]
+        return value
+
+    def clear(self):
+        with self._lock: self._snapshots.clear()
+
+class Overlay:
+    """session 自己的覆寫列：只保存改過的列 (以 key 欄位對齊)，疊在共用快照上就是這個 session 看到的內容。
+
+    base 是這些列修改前的內容，條件式儲存時用來判斷別人是否也改過同一列。
+    """
+
+    def __init__(self, key, rows, base):
+        self.key = key
+        self.rows = rows.reset_index(drop=True)
+        self.base = base.reset_index(drop=True)
+        self.stamp = time.monotonic_ns()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def apply(self, frame, rows=None):
+        """frame 疊上覆寫列 (預設為 self.rows)，只在有覆寫時複製；frame 沒有的鍵值不加入。"""
+        rows = self.rows if rows is None else rows
+        if rows.empty: return frame
+        pos = pd.Index(frame[self.key]).get_indexer(rows[self.key])
+        found = pos >= 0
+        out = frame.copy()
+        for c in rows.columns:
+            if c == self.key or c not in out.columns: continue
+            if out[c].dtype != rows[c].dtype and pd.api.types.is_numeric_dtype(out[c]) and pd.api.types.is_numeric_dtype(rows[c]):
+                out[c] = out[c].astype(rows[c].dtype)
+            out.iloc[pos[found], out.columns.get_loc(c)] = rows.loc[found, c].to_numpy()
+        return out
+
+    def apply_base(self, frame):
+        return self.apply(frame, self.base)
+
+def changed_rows(before, after, key, columns):
+    """after 中與 before (以 key 對齊) 在 columns 上有差異的列。"""
+    old = before.set_index(key)[columns].reindex(after[key])
+    new = after.set_index(key)[columns]
+    diff = ~((old == new) | (old.isna() & new.isna())).all(axis=1)
+    return after[diff.to_numpy()]
+
+_fingerprints = {}   # id(df) -> (df, 指紋)；持有 df 本身，快取期間 id 不會被其他物件重用
+_fingerprint_lock = threading.Lock()
+
+def frame_fingerprint(df):
+    """DataFrame 內容的指紋 (欄位名稱 + 逐列雜湊)：內容相同就相同，不依賴物件 id。
+
+    同一個 (唯讀的共用快照) 物件只計算一次；呼叫端不可在取得指紋後就地修改 df。
+    """
+    with _fingerprint_lock: hit = _fingerprints.get(id(df))
+    if hit is not None and hit[0] is df: return hit[1]
+    rows = pd.util.hash_pandas_object(df, index=False).to_numpy() if len(df.columns) else b""
+    fingerprint = hashlib.blake2b(repr(tuple(df.columns)).encode() + bytes(rows), digest_size=16).hexdigest()
+    with _fingerprint_lock:
+        _fingerprints[id(df)] = (df, fingerprint)
+        while len(_fingerprints) > 16: _fingerprints.pop(next(iter(_fingerprints)))
+    return fingerprint
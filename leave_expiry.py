@@ -0,0 +1,52 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# 假別週期格式：YYYYMMDD~YYYYMMDD (開始日可省略；以 '~' 後的 8 碼數字為到期日)
+PERIOD_PATTERN = r"(?:(\d{8})\s*)?~(\d{8})"
+
+def parse_periods(periods):
+    """週期字串欄位一次以 str.extract 解析成 (開始日, 到期日) 兩欄 datetime64；無法解析的為 NaT。"""
+    parts = periods.astype(str).str.extract(PERIOD_PATTERN)
+    return (pd.to_datetime(parts[0], format="%Y%m%d", errors="coerce"),
+            pd.to_datetime(parts[1], format="%Y%m%d", errors="coerce"))
+
+class LeaveExpiryIndex:
+    """休假到期索引：每位夥伴的「特代休」與「特殊假」各為一筆項目，依到期日排序，「N 天內到期」是一次二分搜尋的區間查詢。
+
+    df 為休假表 (可以是多家門市合併、帶「門市」欄的名冊)；建立後不可修改，依資料版本快取共用。
+    """
+
+    def __init__(self, df):
+        extra = [c for c in ("門市",) if c in df.columns]
+        regular_start, regular_end = parse_periods(df["假別週期"])
+        special_start, special_end = parse_periods(df["特殊假_週期"])
+        entries = pd.concat([
+            pd.DataFrame({"夥伴姓名": df["夥伴姓名"], "類別": "特代休", "假別": "特代休", "週期": df["假別週期"].astype(str),
+                          "開始日": regular_start, "到期日": regular_end, "剩餘": df["特休_剩餘"].astype(float) + df["代休_剩餘"].astype(float),
+                          **{c: df[c] for c in extra}}),
+            pd.DataFrame({"夥伴姓名": df["夥伴姓名"], "類別": "特殊假", "假別": df["特殊假_名稱"], "週期": df["特殊假_週期"].astype(str),
+                          "開始日": special_start, "到期日": special_end, "剩餘": df["特殊假_剩餘"].astype(float),
+                          **{c: df[c] for c in extra}}),
+        ], ignore_index=True)
+        entries["剩餘"] = entries["剩餘"].round(2)  # 時數以 float32 保存，去掉轉成 float64 後的尾數
+        entries = entries[entries["到期日"].notna()]
+        # 同一天到期時依原本的列順序 (先特代休、後特殊假)
+        entries = entries.assign(_row=np.concatenate([np.arange(len(df))] * 2)[entries.index])
+        self.entries = entries.sort_values(["到期日", "_row"], kind="stable").drop(columns="_row").reset_index(drop=True)
+        self._ends = self.entries["到期日"].to_numpy(dtype="datetime64[D]")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def expiring(self, today, days=90):
+        """today 起 days 天內 (含兩端) 到期、且剩餘時數 > 0 的項目，依到期日排序。"""
+        lo = np.searchsorted(self._ends, np.datetime64(today, "D"), side="left")
+        hi = np.searchsorted(self._ends, np.datetime64(today + datetime.timedelta(days=days), "D"), side="right")
+        hit = self.entries.iloc[lo:hi]
+        return hit[hit["剩餘"] > 0]
+
+    def counts(self, today, days=90, by="門市"):
+        """各組 (預設各門市) 即將到期的項目數。"""
+        return self.expiring(today, days)[by].value_counts()
@@ -0,0 +1,152 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# --- 效能量測：各階段的計時區段 (span) 與計數器 ---
+# span：OAuth、試算表讀寫、pandas 解析、儲存合併、data_editor 繪製等階段的耗時，一筆一行 JSON。
+# 計數器：API 呼叫次數、傳輸位元組、快取命中 / 未命中、讀寫列數，依 session 分開累計 (背景寫入執行緒記在 session=None)。
+class PerfRecorder:
+    def __init__(self, maxlen=20000, max_sessions=500, log_path=None):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.records = deque(maxlen=maxlen)
+        self.counters = {}
+        self.runs = {}
+        self._run_start = {}
+        self.max_sessions = max_sessions
+        self._log = open(log_path, "a", encoding="utf-8", buffering=1) if log_path else None
+
+    @staticmethod
+    def session_id():
+        ctx = get_script_run_ctx(suppress_warning=True)
+        return ctx.session_id if ctx else None
+
+    def _emit(self, record):
+        with self._lock:
+            self.records.append(record)
+            if self._log: self._log.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def begin_run(self, **attrs):
+        """每次 script 執行開始時呼叫：這個 session 的執行序號加一，之後的 span 都帶著這個序號。"""
+        session = self.session_id()
+        with self._lock:
+            if session not in self.runs and len(self.runs) >= self.max_sessions:
+                oldest = next(iter(self.runs))
+                self.runs.pop(oldest)
+                self._run_start.pop(oldest, None)
+            self.runs[session] = self.runs.get(session, 0) + 1
+            self._run_start[session] = (time.perf_counter(), Counter(self.counters.get(session, {})), attrs)
+            return self.runs[session]
+
+    def end_run(self):
+        """script 執行結束時呼叫：記錄一筆 run 紀錄 (總耗時與這次執行增加的計數器)，並回傳該筆紀錄。"""
+        session = self.session_id()
+        with self._lock:
+            started, before, attrs = self._run_start.pop(session, (time.perf_counter(), Counter(), {}))
+            counters = Counter(self.counters.get(session, {}))
+        counters.subtract(before)
+        record = {"ts": time.time(), "event": "run", "session": session, "run": self.runs.get(session, 0),
+                  "ms": round((time.perf_counter() - started) * 1000, 3), **attrs, "counters": {k: v for k, v in counters.items() if v}}
+        self._emit(record)
+        return record
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """計時區段；yield 的 dict 可在區段內補上屬性 (例如讀到的列數)。"""
+        session = self.session_id()
+        ts, started, error = time.time(), time.perf_counter(), None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = {"ts": ts, "event": "span", "name": name, "ms": round((time.perf_counter() - started) * 1000, 3),
+                      "session": session, "run": self.runs.get(session, 0), "thread": threading.current_thread().name, **attrs}
+            if error: record["error"] = error
+            self._emit(record)
+
+    def count(self, name, n=1):
+        session = self.session_id()
+        with self._lock:
+            if session not in self.counters:
+                if len(self.counters) >= self.max_sessions: self.counters.pop(next(iter(self.counters)))
+                self.counters[session] = Counter()
+            self.counters[session][name] += n
+
+    def session_counters(self, session):
+        with self._lock: return Counter(self.counters.get(session, {}))
+
+    def session_records(self, session, run=None):
+        """這個 session 與背景執行緒的紀錄；指定 run 時只取這個 session 該次執行的紀錄。"""
+        with self._lock: records = list(self.records)
+        if run is not None: return [r for r in records if r["session"] == session and r.get("run") == run]
+        return [r for r in records if r["session"] in (session, None)]
+
+    def to_jsonl(self, session):
+        """匯出這個 session 與背景執行緒的 span，最後各附一行累計的計數器。"""
+        lines = [json.dumps(r, ensure_ascii=False, default=str) for r in self.session_records(session)]
+        for s in (session, None):
+            lines.append(json.dumps({"ts": time.time(), "event": "counters", "session": s, **self.session_counters(s)}, ensure_ascii=False))
+        return "\n".join(lines) + "\n"
+
+    # 快取命中 / 未命中：快取函式本體只在未命中時執行，由本體在這個執行緒留下標記
+    def cached(self, cache, name=None):
+        """包裝 st.cache_data / st.cache_resource：@perf.cached(st.cache_data(ttl=60))，每次呼叫計入 cache_hit / cache_miss。"""
+        def wrap(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            def body(*args, **kwargs):
+                self._local.__dict__.setdefault("missed", set()).add(label)
+                return fn(*args, **kwargs)
+            cached_fn = cache(body)
+
+            @functools.wraps(fn)
+            def call(*args, **kwargs):
+                missed = self._local.__dict__.setdefault("missed", set())
+                missed.discard(label)
+                with self.span(f"cache.{label}") as attrs:
+                    result = cached_fn(*args, **kwargs)
+                    attrs["hit"] = label not in missed
+                self.count(f"cache_{'hit' if attrs['hit'] else 'miss'}.{label}")
+                return result
+            call.clear = cached_fn.clear
+            return call
+        return wrap
+
+def _perf_config():
+    try: config = dict(st.secrets.get("perf", {}))
+    except Exception: config = {}
+    return {"log": os.environ.get("PERF_LOG", config.get("log"))}
+
+@st.cache_resource(show_spinner=False)
+def get_recorder():
+    """整個 process 共用的紀錄器；設定 PERF_LOG (或 secrets 的 [perf] log) 時同時逐行附加寫入該 JSONL 檔。"""
+    return PerfRecorder(log_path=_perf_config()["log"])
+
+def span(name, **attrs):
+    return get_recorder().span(name, **attrs)
+
+def count(name, n=1):
+    get_recorder().count(name, n)
+
+def cached(cache, name=None):
+    return get_recorder().cached(cache, name)
+
+def track_http(session):
+    """在 requests Session 掛上 response hook：每個 Google API 回應計入 api_calls、bytes_in / bytes_out 與非 2xx 狀態碼。"""
+    def hook(response, *args, **kwargs):
+        count("api_calls")
+        count("bytes_in", len(response.content or b""))
+        body = response.request.body
+        count("bytes_out", len(body) if body else 0)
+        if response.status_code >= 300: count(f"http_{response.status_code}")
+    session.hooks.setdefault("response", []).append(hook)
@@ -0,0 +1,145 @@
+import codecs
+import importlib.util
+import itertools
+import os
+import re
+
+import pandas as pd
+
+import perf
+from schema import SCHEMAS
+
+# --- POS / 外送平台匯出檔匯入 ---
+# 匯出檔逐段 (chunk) 讀取：CSV 以 read_csv(chunksize)，XLSX 以 openpyxl 唯讀模式逐列讀取。每段先把欄位名稱對應到營運報表欄位，
+# 再依 (門市, 日期) 加總併入彙總表；記憶體只保留「門市數 x 天數」的彙總，不保留原始明細，一整年的多門市訂單明細也可以匯入。
+# openpyxl 為選用套件，在函式內 import；未安裝時 xlsx_available() 為 False，只接受 CSV。
+CHUNK_ROWS = 20000
+
+# 由營運報表計算的欄位，不從匯出檔匯入
+DERIVED_COLUMNS = ("PSD達成率", "AT", "貢獻度")
+IMPORT_COLUMNS = [name for name, kind, _ in SCHEMAS["daily"].columns if kind in ("int32", "float32") and name not in DERIVED_COLUMNS]
+
+# 匯出檔欄位名稱 -> 營運報表欄位 (比對時忽略大小寫、空白與 _-/() 等符號；營運報表欄位名稱本身一律可用)
+COLUMN_ALIASES = {
+    "門市": ["門市名稱", "店名", "店別", "Store", "Store Name"],
+    "日期": ["營業日", "營業日期", "交易日期", "訂單日期", "銷售日期", "Date", "Business Date", "Order Date"],
+    "目標PSD": ["目標", "每日目標", "Target"],
+    "實績PSD": ["實績", "營業額", "淨營業額", "銷售額", "Net Sales", "Sales"],
+    "ADT": ["來客", "來客數", "交易筆數", "交易次數", "Transactions", "TC"],
+    "糕點PSD": ["糕點業績", "糕點營業額", "Food Sales"],
+    "糕點USD": ["糕點銷量", "糕點數量", "Food Units"],
+    "糕點報廢USD": ["報廢", "糕點報廢", "Food Waste"],
+    "現烤": ["現烤業績"],
+    "節慶USD": ["節慶", "節慶商品"],
+    "foodpanda": ["熊貓", "Food Panda"],
+    "MOP": ["行動預點", "Mobile Order"],
+    "日工時": ["工時", "總工時", "Labor Hours"],
+}
+# 外送平台的訂單明細：「平台」欄 (或檔名) 決定「金額」欄加到哪一個外送欄位
+PLATFORM_COLUMNS = ["平台", "外送平台", "通路", "Platform", "Channel"]
+AMOUNT_COLUMNS = ["金額", "訂單金額", "實收金額", "銷售金額", "Amount", "Total"]
+PLATFORMS = {"foodpanda": ["foodpanda", "熊貓"], "foodomo": ["foodomo"], "MOP": ["mop", "行動預點", "mobileorder"]}
+
+def _canon(name):
+    return re.sub(r"[\s_\-/()（）.]", "", str(name)).lower()
+
+ALIASES = {_canon(alias): column for column in ["門市", "日期"] + IMPORT_COLUMNS for alias in [column] + COLUMN_ALIASES.get(column, [])}
+
+def xlsx_available():
+    return importlib.util.find_spec("openpyxl") is not None
+
+def match_platform(text):
+    """字串 (平台名稱或檔名) 對應的外送欄位；對應不到時回傳 None。"""
+    text = _canon(text)
+    return next((column for column, names in PLATFORMS.items() if any(n in text for n in names)), None)
+
+def _csv_encoding(file):
+    """以檔頭判斷編碼：UTF-8 (可含 BOM) 或 Big5 (cp950，POS 常見的匯出編碼)。file 為路徑時開檔讀取，檔案物件讀完後回到開頭。"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f: head = f.read(65536)
+    else:
+        head = file.read(65536)
+        file.seek(0)
+    try: codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError: return "cp950"
+    return "utf-8-sig"
+
+def _xlsx_chunks(file, chunksize):
+    from openpyxl import load_workbook
+    book = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = book.worksheets[0].iter_rows(values_only=True)
+        header = ["" if h is None else str(h).strip() for h in next(rows, ())]
+        width = len(header)
+        while block := list(itertools.islice(rows, chunksize)):
+            yield pd.DataFrame([list(r[:width]) + [None] * (width - len(r)) for r in block], columns=header)
+    finally:
+        book.close()
+
+def read_chunks(file, name, chunksize=CHUNK_ROWS):
+    """匯出檔逐段讀成 DataFrame；file 為路徑或檔案物件 (例如 st.file_uploader 上傳的檔案)，name 用來判斷格式。"""
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        yield from _xlsx_chunks(file, chunksize)
+        return
+    with pd.read_csv(file, dtype=str, chunksize=chunksize, encoding=_csv_encoding(file), skipinitialspace=True) as reader:
+        yield from reader
+
+def _numbers(col):
+    if pd.api.types.is_numeric_dtype(col): return col.astype(float)
+    return pd.to_numeric(col.astype(str).str.replace(r"[,$＄\s]|NT", "", regex=True), errors="coerce")
+
+def map_chunk(chunk, platform=None):
+    """一段匯出檔對應到營運報表欄位。
+
+    回傳 (DataFrame[門市, 日期, 匯入的數值欄...], 未對應的欄位名稱)；沒有「門市」欄時門市為 ""，日期無法解析的列捨去。
+    有「平台」與「金額」欄 (或以檔名判斷平台 platform) 時，金額依平台加到 foodpanda / foodomo / MOP。
+    """
+    columns, unmapped = {}, []
+    for c in chunk.columns:
+        target = ALIASES.get(_canon(c))
+        if target is None: unmapped.append(str(c))
+        elif target not in columns: columns[target] = chunk[c]
+    if "日期" not in columns: raise ValueError(f"找不到日期欄位 (可用的欄位名稱：{', '.join(['日期'] + COLUMN_ALIASES['日期'])})")
+
+    dates = pd.to_datetime(columns.pop("日期"), errors="coerce")
+    out = pd.DataFrame({"門市": columns.pop("門市").fillna("").astype(str).str.strip() if "門市" in columns else "",
+                        "日期": dates.dt.normalize()}, index=chunk.index)
+    for c, col in columns.items(): out[c] = _numbers(col)
+
+    amount = next((chunk[c] for c in chunk.columns if _canon(c) in {_canon(a) for a in AMOUNT_COLUMNS}), None)
+    channel = next((chunk[c] for c in chunk.columns if _canon(c) in {_canon(p) for p in PLATFORM_COLUMNS}), None)
+    if amount is not None and (channel is not None or platform):
+        amount = _numbers(amount)
+        if channel is None: targets = pd.Series(platform, index=chunk.index)
+        else:
+            channel = channel.astype(str)
+            targets = channel.map({v: match_platform(v) for v in channel.unique()})
+        for column in PLATFORMS:
+            if not (targets == column).any(): continue
+            value = amount.where(targets == column)
+            out[column] = value if column not in out else out[column].add(value, fill_value=0)
+        unmapped = [c for c in unmapped if _canon(c) not in {_canon(a) for a in AMOUNT_COLUMNS + PLATFORM_COLUMNS}]
+    return out[out["日期"].notna()], unmapped
+
+def aggregate_exports(files, chunksize=CHUNK_ROWS):
+    """多個匯出檔 [(檔名, 路徑或檔案物件), ...] 逐段讀取並依 (門市, 日期) 加總。
+
+    回傳 (彙總, 統計)：彙總以 (門市, 日期) 為 index，只含匯出檔有出現的欄位 (該日沒有值的為 NaN，不會覆寫營運報表)；
+    統計為 {"rows": 讀取列數, "chunks": 段數, "dropped": 日期無法解析的列數, "unmapped": 未對應的欄位名稱}。
+    """
+    totals, stats = None, {"rows": 0, "chunks": 0, "dropped": 0, "unmapped": []}
+    with perf.span("import.aggregate", files=len(files)) as attrs:
+        for name, file in files:
+            platform = match_platform(os.path.basename(name))
+            for chunk in read_chunks(file, name, chunksize):
+                mapped, unmapped = map_chunk(chunk, platform)
+                stats["rows"] += len(chunk)
+                stats["chunks"] += 1
+                stats["dropped"] += len(chunk) - len(mapped)
+                stats["unmapped"] += [c for c in unmapped if c not in stats["unmapped"]]
+                part = mapped.groupby(["門市", "日期"]).sum(min_count=1)
+                # 彙總表只有「門市數 x 天數」列；每段併入後立即重新加總，原始明細隨 chunk 釋放
+                totals = part if totals is None else pd.concat([totals, part]).groupby(level=[0, 1]).sum(min_count=1)
+        attrs.update(rows=stats["rows"], chunks=stats["chunks"], days=0 if totals is None else len(totals))
+    if totals is None: totals = pd.DataFrame(index=pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])], names=["門市", "日期"]))
+    return totals[[c for c in IMPORT_COLUMNS if c in totals.columns]], stats
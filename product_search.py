@@ -0,0 +1,65 @@
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+def normalize(text):
+    """全形轉半形、忽略大小寫與空白。"""
+    return "".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+def ngrams(text, n=2):
+    """單字查詢用 1-gram，其餘用 2-gram (中文品名不需要斷詞)。"""
+    if len(text) < n: return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+class ProductIndex:
+    """商品目錄的搜尋索引：品名 n-gram 倒排索引、品號前綴 (排序陣列 + 二分搜尋) 與檔期 facet。
+
+    search() 回傳依分數排序的列位置 (對應建立索引時 DataFrame 的 iloc)：
+    品號完全相符 > 品號前綴 > 品名包含整個關鍵字 > 品名 n-gram 部分相符 (容錯，至少一半的 n-gram 命中)。
+    """
+
+    def __init__(self, df):
+        self.size = len(df)
+        self.names = [normalize(v) for v in df["品名"]]
+        codes = np.array([normalize(v) for v in df["品號"]], dtype=object)
+        self._code_order = np.argsort(codes, kind="stable")
+        self._codes = codes[self._code_order].astype(str)
+
+        grams = defaultdict(list)
+        for pos, name in enumerate(self.names):
+            for gram in ngrams(name, 1) | ngrams(name, 2):
+                grams[gram].append(pos)
+        self._grams = {g: np.array(p, dtype=np.int32) for g, p in grams.items()}
+
+        facets = defaultdict(list)
+        for pos, season in enumerate(df["檔期"]):
+            facets[str(season)].append(pos)
+        self._facets = {s: np.array(p, dtype=np.int32) for s, p in facets.items()}
+        self.seasons = sorted(s for s in self._facets if s)
+
+    def search(self, query="", season=None):
+        scores = np.zeros(self.size)
+        query = normalize(query)
+        if query:
+            lo = np.searchsorted(self._codes, query, side="left")
+            hi = np.searchsorted(self._codes, query + "\uffff", side="left")
+            scores[self._code_order[lo:hi]] = 80
+            scores[self._code_order[lo:hi][self._codes[lo:hi] == query]] = 100
+
+            qgrams = ngrams(query, 1 if len(query) == 1 else 2)
+            hits = np.zeros(self.size)
+            for gram in qgrams:
+                if gram in self._grams: hits[self._grams[gram]] += 1
+            ratio = hits / len(qgrams)
+            name_score = np.where(ratio >= 0.5, 50 * ratio, 0)
+            name_score[[p for p in np.flatnonzero(ratio == 1) if query in self.names[p]]] = 60
+            scores = np.maximum(scores, name_score)
+            candidates = np.flatnonzero(scores > 0)
+        else:
+            candidates = np.arange(self.size)
+
+        if season is not None:
+            candidates = np.intersect1d(candidates, self._facets.get(str(season), np.array([], dtype=np.int32)))
+        # 分數高的在前，同分維持原目錄順序
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
@@ -0,0 +1,87 @@
+import pandas as pd
+
+class TableSchema:
+    """一張工作表的欄位定義：[(欄位名稱, 型別, 預設值), ...] 與 upsert 用的鍵值欄位。
+
+    型別：date (datetime.date)、int32 (有小數時保留 float64，不截斷)、float32、category、str。
+    讀取 (parse)、初始化與儲存 (to_rows) 都以這份定義為準，欄位順序即寫回試算表的順序。
+    """
+
+    def __init__(self, columns, keys):
+        self.columns = columns
+        self.keys = keys
+        self.names = [name for name, _, _ in columns]
+
+    def empty(self):
+        return self.parse([])
+
+    def parse(self, rows):
+        """含標題列的二維列表 (get_all_values() 格式) 一次轉成帶型別的 DataFrame；缺少的欄位補預設值。"""
+        header = [str(h) for h in rows[0]] if rows else []
+        width = len(header)
+        body = [list(r[:width]) + [""] * (width - len(r)) for r in rows[1:]]
+        values = dict(zip(header, zip(*body))) if body else {}
+        n = len(body)
+        return pd.DataFrame({name: _convert(pd.Series(values[name] if name in values else [default] * n, dtype=object), kind, default)
+                             for name, kind, default in self.columns})
+
+    def to_rows(self, frame):
+        """DataFrame 轉回含標題列的二維列表 (只含 schema 欄位，缺值補預設值、數值轉成 Python 型別)。"""
+        cols = []
+        for name, kind, default in self.columns:
+            col = frame[name] if name in frame.columns else pd.Series([default] * len(frame), index=frame.index, dtype=object)
+            if kind == "date": col = col.astype(str)
+            elif kind == "float32":
+                # float32 以最短十進位表示寫回 (6.6 而不是 6.599999904632568)
+                if col.dtype == "float32": col = pd.Series(col.to_numpy().astype(str), index=col.index)
+                col = pd.to_numeric(col, errors="coerce").fillna(default)
+            elif kind == "int32": col = pd.to_numeric(col, errors="coerce").fillna(default)
+            else: col = col.astype(object).where(col.notna(), default)
+            cols.append(col.tolist())
+        return [list(self.names)] + [list(r) for r in zip(*cols)]
+
+def _convert(col, kind, default):
+    if kind == "date":
+        return pd.to_datetime(col).dt.date
+    if kind in ("str", "category"):
+        col = col.where(col.notna(), default).astype(str)
+        return col.astype("category") if kind == "category" else col
+    raw = col.where(col != "", None)
+    num = pd.to_numeric(raw, errors="coerce")
+    # 試算表顯示格式的數值 (千分位 "135,500")：與 gspread.utils.numericise 相同，去掉逗號再轉換
+    retry = num.isna() & raw.notna()
+    if retry.any(): num[retry] = pd.to_numeric(raw[retry].astype(str).str.replace(",", "", regex=False), errors="coerce")
+    num = num.fillna(default)
+    if kind == "float32": return num.astype("float32")
+    if ((num % 1) == 0).all() and (num.abs() < 2**31).all(): return num.astype("int32")
+    return num.astype(float)
+
+def _ints(*names):
+    return [(name, "int32", 0) for name in names]
+
+SCHEMAS = {
+    "daily": TableSchema(
+        [("日期", "date", "")]
+        + _ints('目標PSD', '實績PSD') + [('PSD達成率', "float32", 0)]
+        + _ints('ADT', 'AT', '糕點PSD', '糕點USD', '糕點報廢USD', 'Retail', 'CB', '現烤', 'BAF', '節慶USD', 'foodpanda', 'foodomo', 'MOP')
+        + [('日工時', "float32", 0)] + _ints('貢獻度') + [('IPLH', "float32", 0)]
+        + _ints('三星蔥寶寶', '竹筍寶寶', '車掌造型娃包', '車長冷水壺', '木紋不鏽鋼杯')
+        + [('備註', "str", "")],
+        keys=["日期"],
+    ),
+    "gift": TableSchema(
+        [('檔期', "str", ""), ('品項', "str", "")] + _ints('原始控量', '剩餘控量'),
+        keys=["檔期", "品項"],
+    ),
+    "leave": TableSchema(
+        [('夥伴姓名', "str", ""), ('職級', "str", ""), ('假別週期', "str", ""),
+         ('特休_剩餘', "float32", 0), ('代休_剩餘', "float32", 0),
+         ('特殊假_名稱', "str", ""), ('特殊假_總時數', "float32", 0), ('特殊假_週期', "str", ""), ('特殊假_剩餘', "float32", 0)],
+        keys=["夥伴姓名"],
+    ),
+    "product": TableSchema(
+        [('檔期', "category", ""), ('分類', "category", ""), ('品號', "str", ""), ('品名', "str", ""),
+         ('售價', "int32", 0), ('訂貨日', "str", ""), ('上市日', "str", ""), ('備註', "str", "")],
+        keys=["檔期", "品號"],
+    ),
+}
@@ -0,0 +1,766 @@
+import atexit
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+import streamlit as st
+
+import perf
+from schema import SCHEMAS
+
+# --- 1. Google Sheet 連線核心 ---
+# 憑證與 client 每個 process 只建立一次；gspread 內部的 AuthorizedSession 會在 token 過期時自動更新。
+# gspread / oauth2client (載入約 0.2 秒) 在函式內 import：第一次用到 Google 試算表時才載入，SQLite 後端完全不載入。
+@st.cache_resource(show_spinner=False)
+def get_gspread_client():
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+    try:
+        creds_dict = dict(st.secrets["gcp_service_account"]) if "gcp_service_account" in st.secrets else dict(st.secrets)
+        if "private_key" in creds_dict: creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
+        with perf.span("sheets.auth"):
+            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+            client = gspread.authorize(creds)
+    except Exception as e:
+        st.error(f"❌ GCP 認證錯誤：請確認 Streamlit Secrets 設定正確。\n{str(e)}")
+        st.stop()
+        raise  # 背景執行緒中 st.stop() 不會中斷，直接拋出原本的錯誤
+    # 計時 hook 在認證成功之後安裝：hook 本身的錯誤不會被誤報成認證錯誤
+    perf.track_http(client.http_client.session)
+    return client
+
+# 試算表 / 工作表 handle 快取：試算表名稱 -> ID，(試算表 ID, 工作表名稱) -> Worksheet
+@st.cache_resource(show_spinner=False)
+def get_handle_cache():
+    return {"lock": threading.Lock(), "ids": {}, "workbooks": {}, "worksheets": {}}
+
+def reset_handle_cache():
+    cache = get_handle_cache()
+    with cache["lock"]:
+        cache["ids"].clear()
+        cache["workbooks"].clear()
+        cache["worksheets"].clear()
+
+def get_workbook(sheet_name):
+    import gspread
+    cache = get_handle_cache()
+    with cache["lock"]:
+        key = cache["ids"].get(sheet_name)
+        if key in cache["workbooks"]: return cache["workbooks"][key]
+    client = get_gspread_client()
+    try:
+        workbook = sheets_call(client.open, sheet_name)
+    except gspread.exceptions.SpreadsheetNotFound:
+        st.error(f"❌ **嚴重錯誤：找不到 Google 試算表「{sheet_name}」**")
+        st.warning("👉 **請確認以下 2 點：**\n\n1. 您的 Google Drive 中確實有這個檔名的試算表。\n2. 您是否已點擊試算表右上角的「共用」，將您的 GCP 服務帳號 Email 加入並設為「編輯者」？")
+        st.stop()
+        raise
+    except Exception as e:
+        st.error(QUOTA_MESSAGE if is_rate_limited(e) else f"❌ 連線到試算表時發生未知錯誤: {e}")
+        st.stop()
+        raise
+    with cache["lock"]:
+        cache["ids"][sheet_name] = workbook.id
+        cache["workbooks"][workbook.id] = workbook
+    return workbook
+
+def get_worksheet(sheet_name, title, index, rows=100, cols=4):
+    """依名稱取得工作表 (找不到時依序嘗試第 index 張、新增工作表；title 為 None 時直接取第 index 張)，並快取 handle。"""
+    import gspread
+    workbook = get_workbook(sheet_name)
+    cache = get_handle_cache()
+    key = (workbook.id, title or f"#{index}")
+    with cache["lock"]:
+        if key in cache["worksheets"]: return cache["worksheets"][key]
+    # 只有「找不到工作表」才往下嘗試；配額或連線錯誤直接拋出，避免誤建重複的工作表
+    if title is None: sheet = sheets_call(workbook.get_worksheet, index)
+    else:
+        try: sheet = sheets_call(workbook.worksheet, title)
+        except gspread.exceptions.WorksheetNotFound:
+            try: sheet = sheets_call(workbook.get_worksheet, index)
+            except gspread.exceptions.WorksheetNotFound: sheet = None
+            if sheet is None: sheet = sheets_call(workbook.add_worksheet, title=title, rows=rows, cols=cols, kind="write", idempotent=False)
+    with cache["lock"]:
+        cache["worksheets"][key] = sheet
+    return sheet
+
+# --- 1.1 API 配額：令牌桶限流、429 / 5xx 退避重試、相同讀取合併 ---
+# Google Sheets API 的配額以「每個使用者 (服務帳號) 每分鐘」計算，讀取與寫入分開；所有 session 與背景執行緒共用同一組令牌桶。
+class RateLimiter:
+    """讀 / 寫各一個令牌桶 (每分鐘 rate_per_minute 次、最多累積 burst 次；rate_per_minute <= 0 表示不限流)。
+
+    call() 先取得令牌再呼叫 gspread；遇到 429 或 5xx 以指數退避 + full jitter 重試 (最多 retries 次)，
+    429 時同時清空令牌桶，讓其他執行緒也一起放慢。屬性每次呼叫時讀取，可在執行期間調整。
+    """
+
+    def __init__(self, rate_per_minute=60, burst=10, retries=5, backoff=1.0, max_backoff=32.0):
+        self.rate_per_minute, self.burst = rate_per_minute, burst
+        self.retries, self.backoff, self.max_backoff = retries, backoff, max_backoff
+        self._lock = threading.Lock()
+        self._buckets = {}   # kind -> [令牌數, 上次補充時間]
+
+    def acquire(self, kind="read"):
+        """取得一個令牌，沒有令牌時等待；回傳等待的秒數。"""
+        waited = 0.0
+        while True:
+            rate = self.rate_per_minute / 60.0
+            if rate <= 0: return waited
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._buckets.setdefault(kind, [float(self.burst), now])
+                bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                    return waited
+                wait = (1 - bucket[0]) / rate
+            time.sleep(wait)
+            waited += wait
+
+    def drain(self, kind="read"):
+        with self._lock:
+            if kind in self._buckets: self._buckets[kind][0] = min(self._buckets[kind][0], 0.0)
+
+    def call(self, fn, *args, kind="read", idempotent=True, **kwargs):
+        """idempotent=False (新增工作表 / 列) 時只重試 429：5xx 的請求可能已經生效。"""
+        import gspread
+        for attempt in range(self.retries + 1):
+            waited = self.acquire(kind)
+            if waited: perf.count("sheets.throttled_ms", int(waited * 1000))
+            try:
+                return fn(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = api_status(e)
+                if attempt >= self.retries or not (status == 429 or (idempotent and status >= 500)): raise
+                if status == 429: self.drain(kind)
+                perf.count(f"sheets.retry_{status}")
+                time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+def api_status(error):
+    """APIError 的 HTTP 狀態碼 (無法取得時為 0)。"""
+    code = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "code", None)
+    try: return int(code)
+    except (TypeError, ValueError): return 0
+
+def is_rate_limited(error):
+    gspread = sys.modules.get("gspread")  # 尚未載入 gspread 時不可能是它的錯誤
+    return gspread is not None and isinstance(error, gspread.exceptions.APIError) and api_status(error) == 429
+
+QUOTA_MESSAGE = "⏳ Google 試算表 API 已達每分鐘配額上限，自動重試後仍失敗；請稍候約一分鐘再按「🔄 重新讀取資料」。"
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    """依 secrets 的 [storage] rate_per_minute / burst / retries / backoff 建立 (環境變數 SHEETS_RATE_PER_MINUTE 優先)。"""
+    config = _storage_config()
+    return RateLimiter(rate_per_minute=float(config["rate_per_minute"]), burst=int(config["burst"]),
+                       retries=int(config["retries"]), backoff=float(config["backoff"]))
+
+def sheets_call(fn, *args, **kwargs):
+    """經過限流與重試呼叫 gspread：sheets_call(sheet.batch_update, updates, kind="write")。"""
+    return get_rate_limiter().call(fn, *args, **kwargs)
+
+class SingleFlight:
+    """相同 key 的並行呼叫共用同一個進行中的請求：第一個呼叫者送出，其他人等待並取得同一個結果 (或錯誤)。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader: call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            perf.count("sheets.coalesced")
+            call["done"].wait()
+            if call["error"] is not None: raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock: del self._calls[key]
+            call["done"].set()
+
+@st.cache_resource(show_spinner=False)
+def get_read_flights():
+    return SingleFlight()
+
+# --- 2. 資料版本：每張工作表一個版本號，寫入時只遞增被改動的那一張，讀取快取以版本號為 key ---
+@st.cache_resource(show_spinner=False)
+def get_data_versions():
+    return {"lock": threading.Lock(), "versions": {}}
+
+def get_data_version(sheet_name, worksheet):
+    store = get_data_versions()
+    with store["lock"]:
+        return store["versions"].get((sheet_name, worksheet), 0)
+
+def bump_data_version(sheet_name, worksheet):
+    store = get_data_versions()
+    with store["lock"]:
+        version = store["versions"].get((sheet_name, worksheet), 0) + 1
+        store["versions"][(sheet_name, worksheet)] = version
+        return version
+
+# --- 3. 差異寫入：與上次讀取/寫入的快照比對，只送出變動的儲存格 ---
+# 每張工作表另有一個寫入世代 (writes)：寫入開始與結束時各遞增一次。讀取前先取得世代，讀回時世代已變 (期間有寫入開始或完成)
+# 就不記下讀到的內容，避免較舊的讀取結果蓋掉寫入後的快照、讓下一次差異寫入略過其實已被改掉的儲存格。
+@st.cache_resource(show_spinner=False)
+def get_sheet_snapshots():
+    return {"lock": threading.Lock(), "rows": {}, "writes": {}}
+
+def write_generation(sheet):
+    store = get_sheet_snapshots()
+    with store["lock"]:
+        return store["writes"].get((sheet.spreadsheet_id, sheet.id), 0)
+
+def _bump_write_generation(sheet):
+    store = get_sheet_snapshots()
+    with store["lock"]:
+        key = (sheet.spreadsheet_id, sheet.id)
+        store["writes"][key] = store["writes"].get(key, 0) + 1
+
+def remember_sheet_rows(sheet, rows, generation=None):
+    """記下工作表目前的內容；generation 為讀取前的寫入世代 (寫入端呼叫時省略)。世代已變時不記下，回傳是否記下。"""
+    store = get_sheet_snapshots()
+    key = (sheet.spreadsheet_id, sheet.id)
+    with store["lock"]:
+        if generation is not None and store["writes"].get(key, 0) != generation: return False
+        store["rows"][key] = [list(r) for r in rows]
+    return True
+
+def _cell_value(v):
+    if v is None or (isinstance(v, float) and v != v): return ""
+    if isinstance(v, bool): return str(v).upper()
+    try: return float(v)
+    except (TypeError, ValueError): return str(v)
+
+def _same_cell(a, b):
+    return _cell_value(a) == _cell_value(b)
+
+def _row_spans(rows, old):
+    """回傳 [(列索引, 起始欄, 結束欄)]：每一列中第一個到最後一個變動儲存格的範圍。"""
+    spans = []
+    width = max([len(r) for r in rows] + [0])
+    for i, row in enumerate(rows):
+        old_row = old[i] if i < len(old) else []
+        changed = [j for j in range(max(len(row), len(old_row)))
+                   if not _same_cell(row[j] if j < len(row) else "", old_row[j] if j < len(old_row) else "")]
+        if changed: spans.append((i, changed[0], changed[-1]))
+    for i in range(len(rows), len(old)):
+        if any(_cell_value(v) != "" for v in old[i]): spans.append((i, 0, max(len(old[i]), width) - 1))
+    return spans
+
+def write_sheet_diff(sheet, rows):
+    """將 rows (含標題列) 與快照比對，以一次 batch_update 寫入變動的列範圍；回傳寫入的儲存格數。"""
+    with perf.span("sheets.write", sheet=sheet.title, rows=max(len(rows) - 1, 0)) as attrs:
+        cells = _write_sheet_diff(sheet, rows)
+        attrs["cells"] = cells
+    perf.count("cells_written", cells)
+    return cells
+
+def _write_sheet_diff(sheet, rows):
+    import gspread
+    store = get_sheet_snapshots()
+    key = (sheet.spreadsheet_id, sheet.id)
+    with store["lock"]: old = store["rows"].get(key)
+    width = max([len(r) for r in rows] + [1])
+    padded = [list(r) + [""] * (width - len(r)) for r in rows]
+
+    if old is None:
+        # 沒有快照時整張覆寫 (不先 clear，避免讀取端看到空表)，再清除多餘的舊列
+        updates = [{"range": f"A1:{gspread.utils.rowcol_to_a1(len(padded), width)}", "values": padded}] if padded else []
+        tail = f"A{len(padded) + 1}:{gspread.utils.rowcol_to_a1(sheet.row_count, sheet.col_count)}" if sheet.row_count > len(padded) else None
+    else:
+        updates, tail = [], None
+        spans = _row_spans(padded, old)
+        # 相鄰且欄位範圍相同的列合併成一個區塊
+        blocks = []
+        for i, c0, c1 in spans:
+            if blocks and blocks[-1][1] == i - 1 and tuple(blocks[-1][2:]) == (c0, c1): blocks[-1][1] = i
+            else: blocks.append([i, i, c0, c1])
+        for r0, r1, c0, c1 in blocks:
+            values = [(padded[i] if i < len(padded) else []) for i in range(r0, r1 + 1)]
+            values = [(r + [""] * (c1 + 1 - len(r)))[c0:c1 + 1] for r in values]
+            updates.append({"range": f"{gspread.utils.rowcol_to_a1(r0 + 1, c0 + 1)}:{gspread.utils.rowcol_to_a1(r1 + 1, c1 + 1)}", "values": values})
+
+    _bump_write_generation(sheet)
+    try:
+        if len(padded) > sheet.row_count: sheets_call(sheet.add_rows, len(padded) - sheet.row_count, kind="write", idempotent=False)
+        if width > sheet.col_count: sheets_call(sheet.add_cols, width - sheet.col_count, kind="write", idempotent=False)
+        if updates: sheets_call(sheet.batch_update, updates, kind="write")
+        if tail: sheets_call(sheet.batch_clear, [tail], kind="write")
+        remember_sheet_rows(sheet, padded)
+    except Exception:
+        # 寫入中途失敗時試算表的內容不確定：丟掉快照，下一次整張覆寫
+        with store["lock"]: store["rows"].pop(key, None)
+        raise
+    finally:
+        _bump_write_generation(sheet)
+    return sum(len(u["values"]) * len(u["values"][0]) for u in updates if u["values"])
+
+
+def merge_rows_by_key(rows, new_rows, keys):
+    """以 keys 欄位對齊，將 new_rows (含標題列) 覆蓋/附加到 rows (含標題列)；未出現的列保持原位。"""
+    if not rows: return [list(r) for r in new_rows]
+    header = list(rows[0]) + [c for c in new_rows[0] if c not in rows[0]]
+    pos = {c: i for i, c in enumerate(header)}
+    merged = [header] + [list(r) + [""] * (len(header) - len(r)) for r in rows[1:]]
+    index = {tuple(str(r[pos[k]]) for k in keys): i for i, r in enumerate(merged) if i > 0}
+    for row in new_rows[1:]:
+        values = dict(zip(new_rows[0], row))
+        key = tuple(str(values.get(k, "")) for k in keys)
+        if key not in index:
+            merged.append([""] * len(header))
+            index[key] = len(merged) - 1
+        target = merged[index[key]]
+        for c, v in values.items(): target[pos[c]] = v
+    return merged
+
+# --- 4. 儲存後端 ---
+# 每個後端以「試算表名稱 + 資料表」讀寫含標題列的二維列表：
+#   read_tables(sheet_name, tables) -> {資料表: get_all_values() 格式、含標題列的二維列表}
+#   write_table(sheet_name, table, rows)  以 rows 取代整張表 (只寫入有變動的部分)
+#   upsert_rows(sheet_name, table, rows)  依 TABLE_KEYS 逐列新增或更新，不刪除其他列
+#   apply_rows(sheet_name, table, rows, upserts, deletes)  條件式儲存的結果：rows 為套用後的整張表，
+#       upserts (含標題列) 為新增 / 修改的列、deletes 為刪除列的鍵值；能逐列寫入的後端只送出這些列
+TABLES = ("daily", "gift", "leave", "product")
+TABLE_KEYS = {t: SCHEMAS[t].keys for t in TABLES}
+SHEET_TABS = {"daily": (None, 0), "gift": ("工作表2", 1), "leave": ("工作表3", 2), "product": ("工作表4", 3)}
+
+READ_PARAMS = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+
+class SheetsBackend:
+    """Google 試算表：sheet1 = 營運報表，工作表2/3/4 = 禮盒 / 休假 / 商品。"""
+    name = "sheets"
+
+    def status(self):
+        return None
+
+    def worksheet(self, sheet_name, table):
+        title, index = SHEET_TABS[table]
+        return get_worksheet(sheet_name, title, index, rows=100, cols=len(SCHEMAS[table].columns))
+
+    def read_tables(self, sheet_name, tables=TABLES):
+        """同時有多個 session 讀取同一組工作表時只送出一次請求；每個呼叫者拿到各自的 dict。"""
+        return dict(get_read_flights().do((sheet_name, tuple(tables)), lambda: self._read_tables(sheet_name, tables)))
+
+    def _read_tables(self, sheet_name, tables):
+        import gspread
+        with perf.span("sheets.read", sheet=sheet_name, tables=list(tables)) as attrs:
+            sheets = {t: self.worksheet(sheet_name, t) for t in tables}
+            generations = {t: write_generation(s) for t, s in sheets.items()}
+            workbook = get_workbook(sheet_name)
+            # 讀取未格式化的數值 (千分位、貨幣格式的儲存格不會變成字串)，日期仍為顯示的字串
+            result = sheets_call(workbook.values_batch_get, [gspread.utils.absolute_range_name(s.title) for s in sheets.values()], params=READ_PARAMS)
+            data = {t: gspread.utils.fill_gaps(vr["values"]) if vr.get("values") else [] for t, vr in zip(sheets, result.get("valueRanges", []))}
+            for t, sheet in sheets.items():
+                data.setdefault(t, [])
+                remember_sheet_rows(sheet, data[t], generations[t])
+            attrs["rows"] = sum(max(len(r) - 1, 0) for r in data.values())
+        perf.count("rows_read", attrs["rows"])
+        return data
+
+    def write_table(self, sheet_name, table, rows):
+        return write_sheet_diff(self.worksheet(sheet_name, table), rows)
+
+    def apply_rows(self, sheet_name, table, rows, upserts, deletes):
+        # 刪除列之後的列要上移，整表差異寫入本來就只送出變動的儲存格
+        return self.write_table(sheet_name, table, rows)
+
+    def upsert_rows(self, sheet_name, table, rows):
+        import gspread
+        sheet = self.worksheet(sheet_name, table)
+        store = get_sheet_snapshots()
+        with store["lock"]: current = store["rows"].get((sheet.spreadsheet_id, sheet.id))
+        if current is None:
+            values = sheets_call(sheet.get_all_values, value_render_option=READ_PARAMS["valueRenderOption"],
+                                 date_time_render_option=READ_PARAMS["dateTimeRenderOption"])
+            current = gspread.utils.fill_gaps(values) if values else []
+        return write_sheet_diff(sheet, merge_rows_by_key(current, rows, TABLE_KEYS[table]))
+
+class SQLiteBackend:
+    """本機 SQLite：每個試算表一個 .sqlite3 檔、每張工作表一個資料表，以 TABLE_KEYS 建唯一索引做列層級 upsert。"""
+    name = "sqlite"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._conns = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def status(self):
+        return None
+
+    def _connect(self, sheet_name):
+        if sheet_name not in self._conns:
+            conn = sqlite3.connect(os.path.join(self.directory, f"{sheet_name}.sqlite3"), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._conns[sheet_name] = conn
+        return self._conns[sheet_name]
+
+    @staticmethod
+    def _q(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    @staticmethod
+    def _columns(conn, table):
+        return [r[1] for r in conn.execute(f"PRAGMA table_info({SQLiteBackend._q(table)})") if r[1] != "_pos"]
+
+    def _ensure_table(self, conn, table, header):
+        q, keys = self._q, TABLE_KEYS[table]
+        cols = keys + [c for c in header if c not in keys]
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {q(table)} (_pos INTEGER, {', '.join(q(c) for c in cols)})")
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {q(table + '_key')} ON {q(table)} ({', '.join(q(k) for k in keys)})")
+        existing = self._columns(conn, table)
+        for c in header:
+            if c not in existing: conn.execute(f"ALTER TABLE {q(table)} ADD COLUMN {q(c)}")
+
+    def _upsert_sql(self, table, header, keep_pos):
+        q, keys = self._q, TABLE_KEYS[table]
+        updates = [f"{q(c)} = excluded.{q(c)}" for c in header if c not in keys]
+        if not keep_pos: updates.insert(0, "_pos = excluded._pos")
+        # keep_pos：既有列維持原本順序，新列接在最後
+        pos = f"(SELECT COALESCE(MAX(_pos), -1) + 1 FROM {q(table)})" if keep_pos else "?"
+        action = f"UPDATE SET {', '.join(updates)}" if updates else "NOTHING"
+        return (f"INSERT INTO {q(table)} (_pos, {', '.join(q(c) for c in header)}) "
+                f"SELECT {pos}, {', '.join('?' for _ in header)} WHERE true "
+                f"ON CONFLICT({', '.join(q(k) for k in keys)}) DO {action}")
+
+    @staticmethod
+    def _header(table, rows):
+        header = list(rows[0])
+        for k in TABLE_KEYS[table]:
+            if k not in header: header.append(k)
+        return header, [list(r) + [""] * (len(header) - len(r)) for r in rows[1:]]
+
+    def read_tables(self, sheet_name, tables=TABLES):
+        data = {}
+        with perf.span("sqlite.read", sheet=sheet_name, tables=list(tables)), self._lock:
+            conn = self._connect(sheet_name)
+            for t in tables:
+                cols = self._columns(conn, t)
+                if not cols:
+                    data[t] = []
+                    continue
+                select = ", ".join(self._q(c) for c in cols)
+                data[t] = [cols] + [["" if v is None else v for v in r]
+                                    for r in conn.execute(f"SELECT {select} FROM {self._q(t)} ORDER BY _pos")]
+        return data
+
+    def write_table(self, sheet_name, table, rows):
+        """以 rows 取代整張表：逐列 upsert，並刪除這次沒有出現的列 (鍵值重複時以最後一列為準)。"""
+        if not rows: return 0
+        header, body = self._header(table, rows)
+        with perf.span("sqlite.write", sheet=sheet_name, table=table, rows=len(body)), self._lock:
+            conn = self._connect(sheet_name)
+            with conn:
+                self._ensure_table(conn, table, header)
+                conn.execute(f"UPDATE {self._q(table)} SET _pos = NULL")
+                conn.executemany(self._upsert_sql(table, header, keep_pos=False), [[i] + r for i, r in enumerate(body)])
+                conn.execute(f"DELETE FROM {self._q(table)} WHERE _pos IS NULL")
+        return len(body) * len(header)
+
+    def upsert_rows(self, sheet_name, table, rows):
+        return self.apply_rows(sheet_name, table, rows, rows, [])
+
+    def apply_rows(self, sheet_name, table, rows, upserts, deletes):
+        """只 upsert 變動的列 (既有列維持順序、新列接在最後) 並刪除 deletes，在同一個交易內完成；rows 不使用。"""
+        if len(upserts) < 2 and not deletes: return 0
+        q, keys = self._q, TABLE_KEYS[table]
+        header, body = self._header(table, upserts) if upserts else (keys, [])
+        with perf.span("sqlite.upsert", sheet=sheet_name, table=table, rows=len(body), deleted=len(deletes)), self._lock:
+            conn = self._connect(sheet_name)
+            with conn:
+                self._ensure_table(conn, table, header)
+                if body: conn.executemany(self._upsert_sql(table, header, keep_pos=True), body)
+                if deletes: conn.executemany(f"DELETE FROM {q(table)} WHERE {' AND '.join(f'{q(k)} = ?' for k in keys)}", [list(k) for k in deletes])
+        return len(body) * len(header)
+
+    def seeded(self, sheet_name):
+        """已從遠端匯入過 (或確認過遠端沒有資料) 的資料表；記在 _seeded 表，本機的空表不會被當成尚未匯入。"""
+        with self._lock:
+            conn = self._connect(sheet_name)
+            conn.execute("CREATE TABLE IF NOT EXISTS _seeded (name TEXT PRIMARY KEY)")
+            return {r[0] for r in conn.execute("SELECT name FROM _seeded")}
+
+    def mark_seeded(self, sheet_name, tables):
+        with self._lock:
+            conn = self._connect(sheet_name)
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS _seeded (name TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO _seeded (name) VALUES (?)", [(t,) for t in tables])
+
+class MirroredBackend:
+    """讀寫都走本機後端；寫入後同步到遠端 (遠端通常包在 WriteBehindBackend 裡，在背景送出)。
+
+    每張表第一次讀取時，本機沒有資料就先從遠端匯入，並記下已匯入 (local.seeded)；之後本機的空表就是真的沒有資料，不再讀遠端。
+    """
+
+    def __init__(self, local, remote):
+        self.local, self.remote = local, remote
+        self.name = f"{local.name}+{remote.name}"
+        self._seeded = set()   # 這個 process 已確認匯入過的 (試算表, 資料表)
+
+    def status(self):
+        return self.remote.status()
+
+    def read_tables(self, sheet_name, tables=TABLES):
+        data = self.local.read_tables(sheet_name, tables)
+        if all((sheet_name, t) in self._seeded for t in tables): return data
+        unseeded = [t for t in tables if t not in self.local.seeded(sheet_name)]
+        missing = [t for t in unseeded if not data.get(t)]
+        if missing:
+            seeded = self.remote.read_tables(sheet_name, missing)
+            for t in missing:
+                if seeded.get(t):
+                    self.local.write_table(sheet_name, t, seeded[t])
+                    data[t] = seeded[t]
+        if unseeded: self.local.mark_seeded(sheet_name, unseeded)
+        self._seeded.update((sheet_name, t) for t in tables)
+        return data
+
+    def write_table(self, sheet_name, table, rows):
+        written = self.local.write_table(sheet_name, table, rows)
+        self.remote.write_table(sheet_name, table, rows)
+        return written
+
+    def upsert_rows(self, sheet_name, table, rows):
+        written = self.local.upsert_rows(sheet_name, table, rows)
+        self.remote.upsert_rows(sheet_name, table, rows)
+        return written
+
+    def apply_rows(self, sheet_name, table, rows, upserts, deletes):
+        written = self.local.apply_rows(sheet_name, table, rows, upserts, deletes)
+        self.remote.apply_rows(sheet_name, table, rows, upserts, deletes)
+        return written
+
+# --- 5. 背景寫入佇列 (write-behind) ---
+class WriteBehindBackend:
+    """寫入先排入佇列並立即返回，由背景執行緒送出。
+
+    同一張表在送出前的多次寫入會合併成一次：整表寫入以最後一次為準，upsert 依 TABLE_KEYS 疊加。
+    送出失敗時以指數退避重試，重試用盡後放回佇列等下一輪；讀取時會疊上尚未送出的寫入，
+    所以畫面上立即看得到剛儲存的內容。
+    """
+
+    def __init__(self, backend, delay=1.0, retries=4, backoff=1.0):
+        self.backend, self.name = backend, backend.name
+        self.delay, self.retries, self.backoff = delay, retries, backoff
+        self._cond = threading.Condition()
+        self._pending = {}   # (sheet_name, table) -> [op, rows]，op 為 "write" 或 "upsert"
+        self._inflight = {}
+        self._stats = {"written": 0, "coalesced": 0, "failed": 0, "last_error": None, "last_written": None}
+        threading.Thread(target=self._run, name="storage-write-behind", daemon=True).start()
+        atexit.register(self.flush, 10)
+
+    @staticmethod
+    def _combine(ops, table, op, rows):
+        """把新的寫入疊到既有的 [op, rows] 上，回傳合併後的 [op, rows]。"""
+        if ops is None or op == "write": return [op, rows]
+        return [ops[0], merge_rows_by_key(ops[1], rows, TABLE_KEYS[table])]
+
+    def _enqueue(self, sheet_name, table, op, rows):
+        rows = [list(r) for r in rows]
+        with self._cond:
+            key = (sheet_name, table)
+            if key in self._pending: self._stats["coalesced"] += 1
+            self._pending[key] = self._combine(self._pending.get(key), table, op, rows)
+            self._cond.notify_all()
+        return len(rows[1:]) * len(rows[0]) if rows else 0
+
+    def write_table(self, sheet_name, table, rows):
+        return self._enqueue(sheet_name, table, "write", rows)
+
+    def upsert_rows(self, sheet_name, table, rows):
+        return self._enqueue(sheet_name, table, "upsert", rows)
+
+    def apply_rows(self, sheet_name, table, rows, upserts, deletes):
+        # 有刪除時排入整表寫入 (送出時仍只寫入變動的儲存格)；只有新增 / 修改時可以跟其他 upsert 合併
+        if deletes: return self.write_table(sheet_name, table, rows)
+        return self.upsert_rows(sheet_name, table, upserts)
+
+    def _queued(self, sheet_name, tables):
+        """送出中與佇列中的 [(資料表, op, rows), ...] (送出中的在前)；呼叫端需持有 self._cond。"""
+        return [(t, *q[(sheet_name, t)]) for q in (self._inflight, self._pending) for t in tables if (sheet_name, t) in q]
+
+    def read_tables(self, sheet_name, tables=TABLES):
+        # 讀取前先記下還沒送出完成的寫入：讀取期間才送出完成的寫入，不在讀取結果裡就在這份紀錄裡。
+        # 讀取期間有寫入送出完成時重讀 (較早的紀錄疊在更新的讀取結果上會蓋掉別人剛寫入的內容)，最多三次；
+        # 仍不穩定時依序疊上讀取前與讀取後的紀錄。
+        for attempt in range(3):
+            with self._cond: before, written = self._queued(sheet_name, tables), self._stats["written"]
+            data = self.backend.read_tables(sheet_name, tables)
+            with self._cond: after, stable = self._queued(sheet_name, tables), self._stats["written"] == written
+            if stable: break
+        for t, op, rows in (after if stable else before + after):
+            data[t] = rows if op == "write" else merge_rows_by_key(data.get(t, []), rows, TABLE_KEYS[t])
+        return data
+
+    def status(self):
+        with self._cond:
+            return dict(self._stats, pending=len(self._pending) + len(self._inflight))
+
+    def flush(self, timeout=None):
+        """等待佇列清空；回傳是否在 timeout 內完成。"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._inflight, timeout)
+
+    def _send(self, sheet_name, table, op, rows):
+        method = self.backend.write_table if op == "write" else self.backend.upsert_rows
+        for attempt in range(self.retries + 1):
+            try:
+                with perf.span("write_behind.send", sheet=sheet_name, table=table, op=op, attempt=attempt):
+                    method(sheet_name, table, rows)
+                return None
+            except Exception as e:
+                error = e
+                perf.count("write_behind.errors")
+                if attempt < self.retries: time.sleep(self.backoff * 2 ** attempt)
+        return error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+            time.sleep(self.delay)  # 收集短時間內連續的儲存
+            with self._cond:
+                self._inflight, self._pending = self._pending, {}
+                batch = dict(self._inflight)
+            for (sheet_name, table), (op, rows) in batch.items():
+                error = self._send(sheet_name, table, op, rows)
+                with self._cond:
+                    if error is None:
+                        self._stats["written"] += 1
+                        self._stats["last_written"] = time.time()
+                        self._stats["last_error"] = None
+                    else:
+                        self._stats["failed"] += 1
+                        self._stats["last_error"] = f"{sheet_name} / {table}: {error}"
+                        # 放回佇列；期間若又有新的寫入，疊在失敗的這筆之上
+                        newer = self._pending.pop((sheet_name, table), None)
+                        merged = [op, rows]
+                        if newer: merged = self._combine(merged, table, *newer)
+                        self._pending[(sheet_name, table)] = merged
+                    del self._inflight[(sheet_name, table)]
+                    self._cond.notify_all()
+
+def _storage_config():
+    try: config = dict(st.secrets.get("storage", {}))
+    except Exception: config = {}
+    return {
+        "backend": os.environ.get("STORAGE_BACKEND", config.get("backend", "sheets")),
+        "path": os.environ.get("STORAGE_PATH", config.get("path", "local_data")),
+        "rate_per_minute": os.environ.get("SHEETS_RATE_PER_MINUTE", config.get("rate_per_minute", 60)),
+        "burst": config.get("burst", 10),
+        "retries": config.get("retries", 5),
+        "backoff": config.get("backoff", 1.0),
+    }
+
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    """依 secrets 的 [storage] 或環境變數 STORAGE_BACKEND / STORAGE_PATH 建立後端：sheets (預設)、sqlite、sqlite+sheets。
+
+    寫入 Google 試算表一律經過背景寫入佇列；本機 SQLite 直接同步寫入。
+    """
+    config = _storage_config()
+    if config["backend"] == "sqlite": return SQLiteBackend(config["path"])
+    if config["backend"] == "sqlite+sheets": return MirroredBackend(SQLiteBackend(config["path"]), WriteBehindBackend(SheetsBackend()))
+    return WriteBehindBackend(SheetsBackend())
+
+# --- 6. 列層級樂觀並行控制 ---
+# 每一列以內容指紋當作版本戳記：儲存時把「這個 session 讀到的版本 (base)」與後端目前的版本比對，
+# 只寫入自己改過的列；別人在這段時間改過、而自己也改了的列視為衝突，保留對方的版本不覆寫。
+@st.cache_resource(show_spinner=False)
+def get_save_lock():
+    """可重入：呼叫端可以在同一把鎖內接著遞增資料版本。"""
+    return threading.RLock()
+
+def row_stamp(row):
+    """列的版本戳記：數值與字串正規化後 (100 與 "100" 視為相同、忽略尾端空白欄) 的內容。"""
+    if row is None: return None
+    values = [_cell_value(v) for v in row]
+    while values and values[-1] == "": values.pop()
+    return tuple(values)
+
+def _rows_by_key(rows, keys, header=None, source=""):
+    """{鍵值: 依 header 欄位順序排列的列}；header 省略時用 rows 自己的標題列。
+
+    鍵值重複時丟出 ValueError 而不是只留下最後一列 (否則合併後會默默刪掉其他同鍵值的列)；source 標示是哪一份資料。
+    """
+    if not rows: return {}
+    pos = {c: i for i, c in enumerate(rows[0])}
+    header = header or list(rows[0])
+    keyed, duplicates = {}, []
+    for r in rows[1:]:
+        r = list(r) + [""] * (len(rows[0]) - len(r))
+        key = tuple(str(r[pos[k]]) if k in pos else "" for k in keys)
+        if key in keyed and key not in duplicates: duplicates.append(key)
+        keyed[key] = [r[pos[c]] if c in pos else "" for c in header]
+    if duplicates:
+        names = "、".join(" / ".join(k) for k in duplicates[:10]) + (" …" if len(duplicates) > 10 else "")
+        raise ValueError(f"{source}有 {len(duplicates)} 組「{' / '.join(keys)}」重複：{names}，請先修正重複的資料再儲存。")
+    return keyed
+
+def save_rows(sheet_name, table, base, rows):
+    """條件式寫入：只把 rows 相對於 base 有變動 (新增 / 修改 / 刪除) 的列套用到後端目前的內容上。
+
+    base 與 rows 都是含標題列的二維列表。回傳 (合併後寫入的內容, 衝突列的鍵值清單)。
+    """
+    storage, keys = get_storage(), TABLE_KEYS[table]
+    with perf.span("save.merge", sheet=sheet_name, table=table) as attrs, get_save_lock():
+        current = storage.read_tables(sheet_name, (table,))[table]
+        header = list(rows[0]) + [c for c in (current[0] if current else []) if c not in rows[0]]
+        base_map, cur_map, new_map = (_rows_by_key(r, keys, header, source) for r, source in ((base, "讀取時的資料"), (current, "試算表目前的資料"), (rows, "編輯後的資料")))
+        conflicts, merged, touched, upserts, deletes = [], dict(cur_map), 0, [header], []
+        for key in list(new_map) + [k for k in base_map if k not in new_map]:
+            mine, before, theirs = new_map.get(key), base_map.get(key), cur_map.get(key)
+            if row_stamp(mine) == row_stamp(before): continue
+            if row_stamp(theirs) not in (row_stamp(before), row_stamp(mine)):
+                conflicts.append(key)
+                continue
+            if mine is None: merged.pop(key, None)
+            else: merged[key] = mine
+            if row_stamp(theirs) != row_stamp(mine):
+                if mine is None: deletes.append(key)
+                else: upserts.append(mine)
+            touched += 1
+        # 維持後端目前的列順序，這次新增的列接在後面；後端只收到實際變動的列
+        result = [header] + list(merged.values())
+        if len(upserts) > 1 or deletes: storage.apply_rows(sheet_name, table, result, upserts, deletes)
+        attrs.update(rows_touched=touched, conflicts=len(conflicts))
+    perf.count("rows_touched", touched)
+    if conflicts: perf.count("save_conflicts", len(conflicts))
+    return result, conflicts
+
+def update_row(sheet_name, table, key, update):
+    """單列的讀取-修改-寫入：在儲存鎖內讀取後端目前的內容，交給 update(該列 {欄位: 值}) 回傳要改的 {欄位: 新值}，
+    只 upsert 這一列的這些欄位 (Google 試算表只寫入變動的儲存格)。update 丟出例外時不寫入。
+
+    key 為依 TABLE_KEYS 順序的鍵值；該列不存在時丟出 KeyError。回傳 (寫入後的整張表, 更新後的該列 {欄位: 值})。
+    """
+    storage, keys = get_storage(), TABLE_KEYS[table]
+    with perf.span("save.update_row", sheet=sheet_name, table=table), get_save_lock():
+        current = storage.read_tables(sheet_name, (table,))[table]
+        header = current[0] if current else []
+        pos, want = {c: i for i, c in enumerate(header)}, tuple(str(k) for k in key)
+        padded = (list(r) + [""] * (len(header) - len(r)) for r in current[1:])
+        hits = [r for r in padded if tuple(str(r[pos[k]]) if k in pos else "" for k in keys) == want]
+        if not hits: raise KeyError(" / ".join(want))
+        # 同鍵值有多列時無法判斷要改哪一列，不寫入
+        if len(hits) > 1: raise ValueError(f"「{' / '.join(want)}」有 {len(hits)} 列重複，請先在試算表修正後再調整")
+        values = dict(zip(header, hits[0]))
+        changes = update(values)
+        patch = [keys + list(changes), [values[k] for k in keys] + list(changes.values())]
+        storage.upsert_rows(sheet_name, table, patch)
+    perf.count("rows_touched")
+    return merge_rows_by_key(current, patch, keys), dict(values, **changes)
@@ -0,0 +1,120 @@
+import calendar
+import datetime
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CALENDAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "calendar")
+WEEKDAY_LABELS = np.array(["(一)", "(二)", "(三)", "(四)", "(五)", "(六)", "(日)"])
+
+def _to_date(date_input):
+    if isinstance(date_input, datetime.datetime): return date_input.date()
+    if isinstance(date_input, datetime.date): return date_input
+    return pd.to_datetime(str(date_input)).date()
+
+class StoreCalendar:
+    """門市行事曆：國定假日、行銷活動、新品檔期與各店每日目標，由 data/calendar/*.json 載入 (一年一個檔案)。
+
+    行銷活動以 [start, end] 日期區間存放在 IntervalIndex，查詢某天 / 某週 / 某月有哪些活動都是一次區間重疊查詢。
+    每個活動可以用 "stores" 限定門市，沒有指定時適用所有門市；同一天的多個活動依 "slot" 排序顯示。
+    """
+
+    def __init__(self, documents):
+        self.version = tuple(sorted((doc.get("year"), doc.get("version", 0)) for doc in documents))
+        self.holidays = {}
+        self.waves = []
+        self.targets = {}
+        campaigns = []
+        for doc in documents:
+            self.holidays.update(doc.get("holidays", {}))
+            self.waves.extend(doc.get("new_product_waves", []))
+            campaigns.extend(doc.get("campaigns", []))
+            for store, info in doc.get("stores", {}).items():
+                for month, psd in info.get("target_psd", {}).items():
+                    self.targets[(store, doc["year"], int(month))] = psd
+
+        self.campaigns = pd.DataFrame(campaigns, columns=["name", "start", "end", "slot", "stores"])
+        self.campaigns["start"] = pd.to_datetime(self.campaigns["start"])
+        self.campaigns["end"] = pd.to_datetime(self.campaigns["end"])
+        self.campaigns["slot"] = self.campaigns["slot"].fillna(0).astype(int)
+        self.campaigns = self.campaigns.sort_values(["start", "slot"], ignore_index=True)
+        self._index = pd.IntervalIndex.from_arrays(self.campaigns["start"], self.campaigns["end"], closed="both")
+
+    @classmethod
+    def load(cls, directory=CALENDAR_DIR):
+        documents = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            with open(path, encoding="utf-8") as f:
+                documents.append(json.load(f))
+        return cls(documents)
+
+    def events_between(self, start, end, store=None):
+        """回傳與 [start, end] 有重疊的活動 (name / start / end / slot)。"""
+        if self.campaigns.empty: return self.campaigns
+        query = pd.Interval(pd.Timestamp(_to_date(start)), pd.Timestamp(_to_date(end)), closed="both")
+        hits = self.campaigns[self._index.overlaps(query)]
+        scoped = [not isinstance(s, list) or store in s for s in hits["stores"]]
+        return hits[pd.Series(scoped, index=hits.index, dtype=bool)]
+
+    def event_text(self, date_input, store=None):
+        """某一天的活動名稱，以「 | 」串接；沒有活動時回傳空字串。"""
+        try: events = self.events_between(date_input, date_input, store)
+        except (ValueError, TypeError): return ""
+        return " | ".join(events.sort_values("slot")["name"])
+
+    def date_dimension(self, start, end, store=None):
+        """[start, end] 每天一列的日期維度表：顯示日期、星期、假日、月份、ISO 週次與當日活動，全部以欄位運算產生。"""
+        days = pd.date_range(_to_date(start), _to_date(end), freq="D")
+        weekday = days.weekday.to_numpy()
+        holiday = pd.Series(days.strftime("%Y-%m-%d")).map(self.holidays).fillna("").to_numpy()
+        suffix = np.where(holiday != "", " " + holiday, np.where(weekday >= 5, " 🟠", ""))
+        dim = pd.DataFrame({
+            "日期": days.date,
+            "顯示日期": days.strftime("%m/%d") + " " + WEEKDAY_LABELS[weekday] + suffix,
+            "星期": weekday,
+            "假日": holiday != "",
+            "Year": days.year,
+            "Month": days.month,
+            "Week_Num": days.isocalendar().week.to_numpy(dtype=int),
+        })
+
+        # 每個活動區間展開成逐日列，再依日期把同一天的活動依 slot 串接
+        events = self.events_between(days[0], days[-1], store) if len(days) else self.campaigns.iloc[:0]
+        lengths = (events["end"] - events["start"]).dt.days.to_numpy() + 1
+        rows = np.repeat(np.arange(len(events)), lengths)
+        offsets = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        per_day = pd.DataFrame({
+            "日期": (events["start"].to_numpy()[rows] + offsets.astype("timedelta64[D]")),
+            "slot": events["slot"].to_numpy()[rows],
+            "name": events["name"].to_numpy()[rows],
+        }).sort_values(["日期", "slot"], kind="stable")
+        text = per_day.groupby("日期")["name"].agg(" | ".join)
+        dim["當日活動"] = text.reindex(days).fillna("").to_numpy()
+        dim.index = pd.Index(days.date)
+        return dim
+
+    def holiday(self, date_input):
+        return self.holidays.get(str(_to_date(date_input)), "")
+
+    def target_psd(self, store, year, month):
+        return self.targets.get((store, year, month), 0)
+
+    @staticmethod
+    def days_in_month(year, month):
+        return calendar.monthrange(year, month)[1]
+
+    def upcoming_waves(self, today, days=7):
+        """訂貨日落在 today 起 days 天內的新品檔期，依訂貨日排序。"""
+        waves = []
+        for wave in self.waves:
+            try:
+                order_dt = datetime.datetime.strptime(wave["order_date"], "%Y-%m-%d").date()
+                launch_dt = datetime.datetime.strptime(wave["launch_date"], "%Y-%m-%d").date()
+            except (KeyError, ValueError):
+                continue
+            if 0 <= (order_dt - today).days <= days:
+                waves.append({**wave, "order_dt": order_dt, "launch_dt": launch_dt})
+        return sorted(waves, key=lambda w: w["order_dt"])
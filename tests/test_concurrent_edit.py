@@ -0,0 +1,72 @@
+"""兩個 session 同時編輯營運報表同一格：後儲存的一方不可默默覆蓋先儲存的一方。
+
+以本機 SQLite 後端執行整個 app (AppTest)；st.data_editor 無法由 AppTest 輸入，
+以 views.daily.editor_tab 的替身套用 session_state[編輯表 key] 裡 st.data_editor 格式的 edited_rows。
+"""
+import os
+
+import pytest
+
+pytest.importorskip("streamlit.testing.v1")
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAVE = "💾 確認更新 (並自動計算)"
+
+@pytest.fixture
+def daily(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("STORAGE_PATH", str(tmp_path))
+    monkeypatch.chdir(ROOT)
+    monkeypatch.syspath_prepend(ROOT)
+    import streamlit as st
+    import views.daily
+
+    def editor_tab(data, key, **kwargs):
+        edits = st.session_state.get(key, {}).get("edited_rows", {})
+        out = data.copy()
+        for row, cells in edits.items():
+            for column, value in cells.items(): out.iloc[row, out.columns.get_loc(column)] = value
+        return out
+
+    monkeypatch.setattr(views.daily, "editor_tab", editor_tab)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    yield
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+def session():
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.run()
+    next(s for s in at.selectbox if s.label == "月份").set_value(10).run()
+    assert not at.exception
+    return at
+
+def edit(at, value):
+    at.session_state["editor_kpi"] = {"edited_rows": {0: {"實績PSD": value}}, "added_rows": [], "deleted_rows": []}
+    at.run()
+    next(b for b in at.button if b.label == SAVE).click().run()
+    assert not at.exception
+
+def sheet_value():
+    from storage import get_storage
+    rows = get_storage().read_tables("Luodong_Linchang_2026_Data", ("daily",))["daily"]
+    header = rows[0]
+    row = next(r for r in rows[1:] if str(r[header.index("日期")]).startswith("2026-10-01"))
+    return float(row[header.index("實績PSD")])
+
+def test_second_save_keeps_first_value(daily):
+    a, b = session(), session()
+    edit(a, 111)
+    assert sheet_value() == 111
+    edit(b, 222)
+    assert sheet_value() == 111
+    assert any("已被其他人修改" in w.value for w in b.warning)
+
+def test_saves_after_reload(daily):
+    a, b = session(), session()
+    edit(a, 111)
+    b.run()
+    edit(b, 222)
+    assert sheet_value() == 222
@@ -0,0 +1,28 @@
+"""試算表讀回的內容轉型：顯示格式的數值 (千分位) 要解析成原本的數值，不可變成 0。"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema import SCHEMAS
+from storage import row_stamp
+
+HEADER = ["日期", "目標PSD", "實績PSD", "ADT", "日工時", "備註"]
+
+def test_thousands_separator():
+    df = SCHEMAS["daily"].parse([HEADER, ["2026-10-01", "150,000", "135,500", "1,204", "1,000.5", "1,2"]])
+    assert df.loc[0, "目標PSD"] == 150000
+    assert df.loc[0, "實績PSD"] == 135500
+    assert df.loc[0, "ADT"] == 1204
+    assert df.loc[0, "日工時"] == 1000.5
+    assert df.loc[0, "備註"] == "1,2"
+
+def test_unformatted_and_formatted_rows_match():
+    formatted = SCHEMAS["daily"].parse([HEADER, ["2026-10-01", "150,000", "135,500", "1,204", "8", ""]])
+    unformatted = SCHEMAS["daily"].parse([HEADER, ["2026-10-01", 150000, 135500, 1204, 8, ""]])
+    assert [row_stamp(r) for r in SCHEMAS["daily"].to_rows(formatted)] == [row_stamp(r) for r in SCHEMAS["daily"].to_rows(unformatted)]
+
+def test_blank_and_text_cells_use_default():
+    df = SCHEMAS["daily"].parse([HEADER, ["2026-10-01", "", "n/a", "", "", ""]])
+    assert df.loc[0, "目標PSD"] == 0
+    assert df.loc[0, "實績PSD"] == 0
@@ -0,0 +1,50 @@
+"""背景寫入佇列的讀取：讀取期間送出完成的寫入，不可從讀取結果中消失。"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import WriteBehindBackend
+
+HEADER = ["檔期", "品項", "原始控量", "剩餘控量"]
+
+class SlowBackend:
+    """記憶體內的後端：第一次讀取先取得 (寫入前的) 內容，等背景寫入送出完成後才回傳。"""
+    name = "memory"
+
+    def __init__(self):
+        self.tables = {"gift": [HEADER, ["中秋節", "月餅禮盒", 100, 40]]}
+        self.copied = threading.Event()
+        self.queue = None
+        self.reads = 0
+
+    def read_tables(self, sheet_name, tables):
+        self.reads += 1
+        data = {t: [list(r) for r in self.tables.get(t, [])] for t in tables}
+        if self.reads == 1:
+            self.copied.set()
+            assert self.queue.flush(5)
+        return data
+
+    def write_table(self, sheet_name, table, rows):
+        self.copied.wait(5)
+        self.tables[table] = [list(r) for r in rows]
+
+    def upsert_rows(self, sheet_name, table, rows):
+        raise AssertionError("not used")
+
+def test_read_sees_write_completed_during_read():
+    backend = SlowBackend()
+    queue = backend.queue = WriteBehindBackend(backend, delay=0.0, retries=0)
+    queue.write_table("S", "gift", [HEADER, ["中秋節", "月餅禮盒", 100, 30]])
+    data = queue.read_tables("S", ("gift",))
+    assert data["gift"][1][3] == 30
+    assert backend.tables["gift"][1][3] == 30
+
+def test_read_without_writes_reads_once():
+    backend = SlowBackend()
+    backend.reads = 1
+    queue = backend.queue = WriteBehindBackend(backend, delay=0.0, retries=0)
+    assert queue.read_tables("S", ("gift",))["gift"][1][3] == 40
+    assert backend.reads == 2
@@ -0,0 +1,29 @@
+import importlib
+import os
+
+import streamlit as st
+
+import perf
+
+# 側邊欄選項 -> views/ 下的模組；每次執行只 import (每個 process 一次) 並執行選到的頁面
+PAGES = {
+    "📊 每日營運報表": "daily",
+    "🎁 節慶禮盒控管": "gift",
+    "👥 夥伴休假管理": "leave",
+    "📦 新品查詢與訂貨": "product",
+    "🗺️ 區域總覽": "region",
+}
+
+def render_page(page, store_choice, current_sheet):
+    importlib.import_module(f"views.{PAGES[page]}").render(store_choice, current_sheet)
+
+@st.cache_resource(show_spinner=False)
+def page_style():
+    """views/style.css 包成 <style> 區塊；每個 process 讀一次檔，每次執行仍要送出 (Streamlit 會移除這次沒有畫出的元素)。"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css"), encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+def data_editor(data, **kwargs):
+    """st.data_editor 加上計時 (span 名稱為 render.<key>)。"""
+    with perf.span(f"render.{kwargs.get('key')}", rows=len(data)):
+        return st.data_editor(data, **kwargs)
@@ -0,0 +1,339 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from data_layer import (get_calendar, get_event_info, load_data, get_kpi_cube, update_kpi_cube, publish_kpi_cube, build_kpi_cube,
+                        merge_daily_edits, save_data_to_sheet, kpis_from_totals, build_ai_prompt, archive_available, archive_configured,
+                        archived_months, closed_months, archive_closed_months, load_history, compare_last_year, add_year, month_target,
+                        import_pos_exports)
+from datasets import Overlay, changed_rows
+from pos_import import xlsx_available
+from schema import SCHEMAS
+from storage import get_data_version
+from views import data_editor
+
+EDITOR_KEYS = ("editor_kpi", "editor_prod", "editor_special", "editor_delivery", "editor_labor")
+
+# 五個編輯表與下方看板各自是 fragment：在表格中輸入只重新執行該表格，切換看板模式只重新執行看板；
+# 月份切換與儲存 (st.rerun) 才整頁重新執行，看板也只在這時依新的資料版本重算。
+@st.fragment
+def editor_tab(data, **kwargs):
+    """單一編輯表；整頁執行時回傳編輯後的內容，供「確認更新」合併五個表格。"""
+    return data_editor(data, **kwargs)
+
+def edit_base(current_sheet, selected_year, selected_month, month_df, daily_version):
+    """這個月份開始編輯時的 (資料版本, 內容)，存在 session_state，儲存成功前都以它當條件式儲存的 base。
+
+    儲存時才從快照取 base 的話，別人在這段時間存入的同一格會被這個 session 的值默默覆蓋；
+    只有編輯表都還沒有修改時 (剛進入這個月份、或儲存成功後) 才換成目前的內容。
+    """
+    bases = st.session_state.setdefault("daily_base", {})
+    key = (current_sheet, selected_year, selected_month)
+    editing = any(st.session_state.get(k, {}).get("edited_rows") for k in EDITOR_KEYS)
+    if key not in bases or not editing: bases[key] = (daily_version, month_df)
+    return bases[key]
+
+def render(store_choice, current_sheet):
+    """頁面：每日營運報表。"""
+    tw_tz = datetime.timezone(datetime.timedelta(hours=8))
+    today = datetime.datetime.now(tw_tz).date()
+    today_event = get_event_info(today, store_choice)
+    today_str = today.strftime('%m/%d')
+    
+    active_waves_list = [
+        f"🛒 {w['order_dt'].strftime('%m/%d')}開放訂 / {w['launch_dt'].strftime('%m/%d')}上市 {w['name']}檔期新品"
+        for w in get_calendar().upcoming_waves(today, 7)
+    ]
+
+    title = st.empty()  # 年度在讀取資料後才選定
+    
+    st.markdown(f"""
+    <div class="activity-box">
+        <div class="activity-title">📢 門市活動快訊 (Today: {today_str})</div>
+        <div class="main-event">
+            👉 今日重點：{today_event if today_event else "無特別活動，回歸基本面銷售。"}
+        </div>
+        {''.join([f'<div class="order-alert">{msg}</div>' for msg in active_waves_list])}
+    </div>
+    """, unsafe_allow_html=True)
+
+    # 營運報表與 KPI 彙總表是所有 session 共用的唯讀快照；這個 session 只保存儲存失敗、尚未寫入的修改列
+    daily_version = get_data_version(current_sheet, "daily")
+    snapshot = load_data(current_sheet)
+    if snapshot.empty: st.stop()
+    cube = get_kpi_cube(current_sheet, daily_version, snapshot)
+    pending = st.session_state.get("daily_pending", {}).get(current_sheet)
+    df = snapshot
+    if pending:
+        df = pending.apply(snapshot)
+        cube = update_kpi_cube(cube, df, pending.rows["日期"])
+        st.warning(f"⚠️ 有 {len(pending)} 天的修改尚未儲存成功，請再按一次「💾 確認更新」。")
+    data_version = (current_sheet, daily_version, pending.stamp if pending else None)
+
+    # 年度選項：營運報表與歷史封存中有的年度，加上今年 (新年度還沒有資料時可以建立)
+    archived = archived_months(current_sheet)
+    years = sorted({int(y) for y in df["Year"].unique()} | {y for y, _ in archived} | {today.year})
+    col_year, col_month = st.columns(2)
+    selected_year = col_year.selectbox("年度", years, index=years.index(today.year))
+    selected_month = col_month.selectbox("月份", range(1, 13), index=today.month - 1)
+    title.title(f"☕ {selected_year} {store_choice}營運報表")
+    month_pos = df.groupby(["Year", "Month"]).indices.get((selected_year, selected_month), [])
+    if len(month_pos) == 0:
+        if (selected_year, selected_month) in archived: render_archived_month(current_sheet, store_choice, selected_year, selected_month)
+        else:
+            st.info(f"營運報表中沒有 {selected_year} 年 {selected_month} 月的資料。")
+            if st.button(f"📅 建立 {selected_year} 年度的日期列"):
+                if add_year(current_sheet, selected_year) is not None: st.rerun()
+        render_archive_panel(current_sheet, snapshot, today, archived)
+        return
+    current_month_df = df.iloc[month_pos].copy()
+    base_version, base_df = edit_base(current_sheet, selected_year, selected_month, snapshot.iloc[month_pos], daily_version)
+    if base_version != daily_version: st.info("ℹ️ 開始編輯後已有其他人儲存新的資料；同一天的資料若對方也改過，儲存時會保留對方的版本。")
+
+    st.subheader(f"📝 {selected_month} 月數據輸入")
+    
+    tab1, tab2, tab_special, tab3, tab4 = st.tabs(["📊 核心業績", "🥐 商品與庫存", "🛍️ 特色商品", "🛵 外送平台", "⏱️ 人力工時 (Labor)"])
+
+    with tab1:
+        st.caption("請輸入每日業績。")
+        edited_kpi = editor_tab(
+            current_month_df[['顯示日期', '日期', '目標PSD', '實績PSD', 'PSD達成率', 'ADT', 'AT', '備註', '當日活動']],
+            column_config={
+                "顯示日期": st.column_config.TextColumn("日期", disabled=True, width="small"),
+                "日期": None,
+                "目標PSD": st.column_config.NumberColumn("每日目標", format="$%d"),
+                "實績PSD": st.column_config.NumberColumn("實績", format="$%d"),
+                "PSD達成率": st.column_config.NumberColumn("達成%", disabled=True, format="%.1f%%"),
+                "ADT": st.column_config.NumberColumn("來客", format="%d"),
+                "AT": st.column_config.NumberColumn("客單", disabled=True, format="$%d"),
+                "備註": st.column_config.TextColumn("手動備註", width="small"),
+                "當日活動": st.column_config.TextColumn("📅 當日活動 (自動)", disabled=True, width="medium"), 
+            },
+            use_container_width=True, hide_index=True, num_rows="fixed", key="editor_kpi"
+        )
+
+    with tab2:
+        edited_prod = editor_tab(
+            current_month_df[['顯示日期', '日期', '糕點PSD', '糕點USD', '糕點報廢USD', 'Retail', 'CB', '現烤', 'BAF', '節慶USD']],
+            column_config={
+                "顯示日期": st.column_config.TextColumn("日期", disabled=True, width="small"),
+                "日期": None,
+                "糕點PSD": st.column_config.NumberColumn("糕點業績", format="$%d"),
+                "糕點USD": st.column_config.NumberColumn("糕點銷量", format="%d"),
+                "糕點報廢USD": st.column_config.NumberColumn("報廢(個)", format="%d"),
+                "Retail": st.column_config.NumberColumn("Retail", format="$%d"),
+                "CB": st.column_config.NumberColumn("CB", format="%d"),
+                "現烤": st.column_config.NumberColumn("現烤", format="$%d"),
+                "BAF": st.column_config.NumberColumn("BAF", format="%d"),
+                "節慶USD": st.column_config.NumberColumn("節慶", format="%d"),
+            },
+            use_container_width=True, hide_index=True, num_rows="fixed", key="editor_prod"
+        )
+        
+    with tab_special:
+        st.caption("每日記錄羅東林場獨有的特色商品銷售數量。")
+        
+        # 顯示全年度的「總累計」(已封存的月份一併計入)
+        special = ['三星蔥寶寶', '竹筍寶寶', '車掌造型娃包', '車長冷水壺', '木紋不鏽鋼杯']
+        special_total = df.loc[df["Year"] == selected_year, special].sum()
+        if any(y == selected_year for y, _ in archived):
+            history = load_history(current_sheet, datetime.date(selected_year, 1, 1), datetime.date(selected_year, 12, 31), ("日期", *special), get_data_version(current_sheet, "archive"))
+            special_total = special_total + history[special].sum()
+        c1, c2, c3, c4, c5 = st.columns(5)
+        c1.metric("三星蔥寶寶 (總累計)", f"{special_total['三星蔥寶寶']:.0f} 件")
+        c2.metric("竹筍寶寶 (總累計)", f"{special_total['竹筍寶寶']:.0f} 件")
+        c3.metric("車掌造型娃包 (總累計)", f"{special_total['車掌造型娃包']:.0f} 件")
+        c4.metric("車長冷水壺 (總累計)", f"{special_total['車長冷水壺']:.0f} 件")
+        c5.metric("木紋不鏽鋼杯 (總累計)", f"{special_total['木紋不鏽鋼杯']:.0f} 件")
+        st.markdown("---")
+        
+        edited_special = editor_tab(
+            current_month_df[['顯示日期', '日期', '三星蔥寶寶', '竹筍寶寶', '車掌造型娃包', '車長冷水壺', '木紋不鏽鋼杯']],
+            column_config={
+                "顯示日期": st.column_config.TextColumn("日期", disabled=True, width="small"),
+                "日期": None,
+                "三星蔥寶寶": st.column_config.NumberColumn("三星蔥寶寶", format="%d"),
+                "竹筍寶寶": st.column_config.NumberColumn("竹筍寶寶", format="%d"),
+                "車掌造型娃包": st.column_config.NumberColumn("車掌造型娃包", format="%d"),
+                "車長冷水壺": st.column_config.NumberColumn("車長冷水壺", format="%d"),
+                "木紋不鏽鋼杯": st.column_config.NumberColumn("木紋不鏽鋼杯", format="%d"),
+            },
+            use_container_width=True, hide_index=True, num_rows="fixed", key="editor_special"
+        )
+    
+    with tab3:
+        edited_delivery = editor_tab(
+            current_month_df[['顯示日期', '日期', 'foodpanda', 'foodomo', 'MOP']],
+            column_config={
+                "顯示日期": st.column_config.TextColumn("日期", disabled=True, width="small"),
+                "日期": None,
+                "foodpanda": st.column_config.NumberColumn("Foodpanda", format="$%d"),
+                "foodomo": st.column_config.NumberColumn("Foodomo", format="$%d"),
+                "MOP": st.column_config.NumberColumn("MOP", format="$%d"),
+            },
+            use_container_width=True, hide_index=True, num_rows="fixed", key="editor_delivery"
+        )
+
+    with tab4:
+        st.caption("請輸入當日總工時，「貢獻度」將於儲存時自動計算 (PSD / 日工時)。")
+        edited_labor = editor_tab(
+            current_month_df[['顯示日期', '日期', '日工時', '貢獻度', 'IPLH']],
+            column_config={
+                "顯示日期": st.column_config.TextColumn("日期", disabled=True, width="small"),
+                "日期": None,
+                "日工時": st.column_config.NumberColumn("日工時 (hr)", min_value=0.0, step=0.5, format="%.1f"),
+                "貢獻度": st.column_config.NumberColumn("貢獻度 (Sales/Hr)", disabled=True, format="$%d", help="自動計算：實績PSD / 日工時"),
+                "IPLH": st.column_config.NumberColumn("IPLH", min_value=0.0, step=0.1, format="%.1f"),
+            },
+            use_container_width=True, hide_index=True, num_rows="fixed", key="editor_labor"
+        )
+
+    if st.button("💾 確認更新 (並自動計算)", type="primary"):
+        # 只送出這個月 (與先前未儲存成功) 的列；base 為這些列修改前的內容
+        merged = merge_daily_edits(current_month_df, edited_kpi, edited_prod, edited_special, edited_delivery, edited_labor)
+        if pending:
+            base_df = pending.apply_base(base_df)
+            others = ~pending.rows["日期"].isin(merged["日期"])
+            merged = pd.concat([merged, pending.rows[others]], ignore_index=True)
+            base_df = pd.concat([base_df, pending.base[~pending.base["日期"].isin(base_df["日期"])]], ignore_index=True)
+        saved = save_data_to_sheet(current_sheet, base_df, merged)
+        pendings = st.session_state.setdefault("daily_pending", {})
+        if saved is None:
+            changed = changed_rows(base_df, merged, "日期", SCHEMAS["daily"].names[1:])
+            pendings[current_sheet] = Overlay("日期", changed, base_df[base_df["日期"].isin(changed["日期"])])
+        else:
+            pendings.pop(current_sheet, None)
+            st.session_state.daily_base.pop((current_sheet, selected_year, selected_month), None)
+            publish_kpi_cube(current_sheet, daily_version, snapshot, *saved)
+        st.rerun()
+
+    render_dashboard(current_sheet, current_month_df, cube, selected_year, selected_month, store_choice, data_version)
+    render_import_panel(store_choice, current_sheet)
+    render_archive_panel(current_sheet, snapshot, today, archived)
+
+def render_archived_month(current_sheet, store_choice, selected_year, selected_month):
+    """已移到歷史封存的月份：唯讀顯示，看板與 AI 指令照常。"""
+    start = datetime.date(selected_year, selected_month, 1)
+    end = datetime.date(selected_year, selected_month, get_calendar().days_in_month(selected_year, selected_month))
+    archive_version = get_data_version(current_sheet, "archive")
+    month_df = load_history(current_sheet, start, end, None, archive_version)
+    st.subheader(f"🗄️ {selected_month} 月數據 (已封存)")
+    st.info("這個月份已移到歷史封存，僅供檢視。")
+    st.dataframe(month_df[["顯示日期"] + SCHEMAS["daily"].names[1:] + ["當日活動"]], use_container_width=True, hide_index=True)
+    render_dashboard(current_sheet, month_df, build_kpi_cube(month_df), selected_year, selected_month, store_choice, (current_sheet, ("archive", archive_version), None))
+
+def render_import_panel(store_choice, current_sheet):
+    """POS / 外送平台匯出檔 (CSV / XLSX) 匯入營運報表，取代手動輸入。"""
+    st.markdown("---")
+    with st.expander("📥 匯入 POS / 外送平台報表", expanded="import_report" in st.session_state):
+        report = st.session_state.pop("import_report", None)
+        if report:
+            st.success(f"已讀取 {report['rows']:,} 列 ({report['chunks']} 段)："
+                       + "、".join(f"{name} 更新 {done} 天" + (f" (略過 {skipped} 天)" if skipped else "") for name, (done, skipped) in report["stores"].items()))
+            if report["unknown"]: st.warning("門市清單中找不到：" + "、".join(report["unknown"]))
+            if report["dropped"]: st.warning(f"{report['dropped']:,} 列的日期無法解析，已略過。")
+            if report["unmapped"]: st.caption("未匯入的欄位：" + "、".join(report["unmapped"]))
+        st.caption(f"依「日期」(與「門市」) 加總後只覆寫匯入檔有的欄位，並重算達成率 / 客單 / 貢獻度；沒有「門市」欄時匯入 {store_choice}。"
+                   "外送平台訂單明細以「平台」欄或檔名判斷 foodpanda / foodomo / MOP。")
+        files = st.file_uploader("匯出檔", type=["csv", "xlsx"] if xlsx_available() else ["csv"], accept_multiple_files=True, key="pos_import_files")
+        if files and st.button("📥 匯入"):
+            report = import_pos_exports([(f.name, f) for f in files], store_choice, current_sheet)
+            if report is not None:
+                st.session_state.import_report = report
+                st.rerun()
+
+def render_archive_panel(current_sheet, snapshot, today, archived):
+    """把已結束的月份移出營運報表 (試算表只留目前的期間)。"""
+    st.markdown("---")
+    with st.expander("🗄️ 歷史封存", expanded=False):
+        if not archive_available():
+            st.caption("安裝 pyarrow 後，可將已結束的月份封存為 Parquet 並顯示去年同期比較。")
+            return
+        if archived: st.caption("已封存：" + "、".join(f"{y}/{m:02d}" for y, m in archived))
+        if not archive_configured():
+            st.caption("尚未設定封存路徑：請以環境變數 ARCHIVE_PATH 或 secrets 的 [archive] path 指定可長期保存的位置 (雲端部署的本機磁碟重新部署後會清空)，才能封存並移出營運報表。")
+            return
+        months = closed_months(snapshot, today)
+        if not months:
+            st.caption("目前沒有可封存的月份。")
+            return
+        st.markdown(f"可封存 {len(months)} 個已結束的月份：" + "、".join(f"{y}/{m:02d}" for y, m in months))
+        if st.button("📦 封存並移出營運報表"):
+            if archive_closed_months(current_sheet, today) is not None: st.rerun()
+
+@st.fragment
+def render_dashboard(current_sheet, current_month_df, cube, selected_year, selected_month, store_choice, data_version):
+    """KPI 看板與 AI 指令；fragment 重新執行時沿用上次整頁執行傳入的月份資料與彙總表。"""
+    st.markdown("---")
+    st.subheader("📅 數據檢視與 AI 分析")
+    col_view, col_week = st.columns([1, 3])
+    with col_view:
+        view_mode = st.radio("選擇模式", ["全月累計", "單週分析"], horizontal=True, label_visibility="collapsed")
+    target_df = current_month_df
+    month_key = (selected_year, selected_month)
+    totals = cube["month"].reindex(pd.MultiIndex.from_tuples([month_key])).iloc[0].fillna(0)
+    if view_mode == "單週分析":
+        index = cube["week"].index
+        in_month = (index.get_level_values("Year") == selected_year) & (index.get_level_values("Month") == selected_month)
+        weeks = cube["week"][in_month].droplevel(["Year", "Month"])
+        week_options = {f"Week {w} | {row['start'].strftime('%m/%d')} ~ {row['end'].strftime('%m/%d')}": w for w, row in weeks.iterrows()}
+        with col_week:
+            if week_options:
+                sel_label = st.selectbox("選擇週次", list(week_options.keys()), index=len(week_options)-1)
+                target_df = current_month_df[current_month_df["Week_Num"] == week_options[sel_label]]
+                totals = weeks.loc[week_options[sel_label]]
+
+    if view_mode == "全月累計":
+        total_target = month_target(store_choice, selected_year, selected_month)
+    else:
+        total_target = totals["目標PSD"]
+        
+    kpi = kpis_from_totals(totals, total_target)
+    total_sales, achieve_rate = kpi["total_sales"], kpi["achieve_rate"]
+
+    st.markdown("##### 🏆 核心績效看板")
+    m1, m2, m3, m4, m5 = st.columns(5)
+    m1.metric("累積 SALES", f"${total_sales:,.0f}")
+    m2.metric("達成率 (依選定區間)", f"{achieve_rate:.1f}%", delta=f"${total_sales - total_target:,.0f}")
+    m3.metric("平均 PSD", f"${kpi['avg_psd']:,.0f}")
+    m4.metric("平均 ADT", f"{kpi['avg_adt']:,.0f}")
+    m5.metric("平均 AT", f"${kpi['avg_at']:,.0f}")
+
+    yoy = compare_last_year(current_sheet, target_df)
+    if yoy:
+        st.markdown("##### 📈 去年同期比較 (歷史封存)")
+        y1, y2, y3 = st.columns(3)
+        for col, label, key, matched in ((y1, "去年同日 SALES", "same_date", "matched_date"), (y2, "去年同星期 SALES", "same_weekday", "matched_weekday")):
+            last = yoy[key]["實績PSD"]
+            col.metric(label, f"${last:,.0f}", delta=f"{(yoy['current']['實績PSD'] / last - 1) * 100:+.1f}%" if last > 0 else None,
+                       help=f"對到 {yoy[matched]} 天；同星期為 364 天前")
+        last_adt = yoy["same_weekday"]["ADT"]
+        y3.metric("去年同星期 ADT", f"{last_adt:,.0f}", delta=f"{(yoy['current']['ADT'] / last_adt - 1) * 100:+.1f}%" if last_adt > 0 else None)
+
+    st.markdown("##### 🛵 多元通路與效率看板")
+    d1, d2, d3, d4, d5 = st.columns(5)
+    d1.metric("平均貢獻度", f"${kpi['avg_contrib']:,.0f}", help="區間總業績 / 區間總工時")
+    d2.metric("外送平台 PSD", f"${kpi['avg_delivery_total']:,.0f}")
+    d3.metric("熊貓 PSD", f"${kpi['avg_panda']:,.0f}")
+    d4.metric("FDM PSD", f"${kpi['avg_fdm']:,.0f}")
+    d5.metric("MOP PSD", f"${kpi['avg_mop']:,.0f}")
+
+    st.markdown("##### ⚡ 關鍵指標 (日平均)")
+    k1, k2, k3, k4, k5, k6 = st.columns(6)
+    if kpi["valid_days"] > 0:
+        means = kpi["daily_means"]
+        k1.metric("糕點 PSD", f"${means['糕點PSD']:,.0f}")
+        k2.metric("糕點 USD", f"{means['糕點USD']:.1f} 個")
+        k3.metric("糕點報廢", f"{means['糕點報廢USD']:.1f} 個", delta_color="inverse")
+        k4.metric("CB 杯數", f"{means['CB']:.1f}")
+        k5.metric("現烤", f"${means['現烤']:,.0f}")
+        k6.metric("Retail", f"${means['Retail']:,.0f}")
+
+    st.markdown("---")
+    st.subheader("🤖 呼叫 AI 營運顧問")
+    with st.expander("點擊展開：取得 AI 深度分析指令 (含行銷活動)", expanded=False):
+        period_str = f"{selected_year}年 {selected_month}月 ({view_mode})"
+        period = (selected_year, selected_month, view_mode, sel_label if view_mode == "單週分析" and week_options else None)
+        ai_prompt = build_ai_prompt(target_df, data_version, store_choice, period, period_str, total_target)
+        st.code(ai_prompt, language="text")
@@ -0,0 +1,70 @@
+import streamlit as st
+
+from data_layer import adjust_gift_stock, load_gift_data, save_gift_data
+from views import data_editor
+
+def render(store_choice, current_sheet):
+    """頁面：節慶禮盒控管。"""
+    st.title(f"🎁 {store_choice} | 節慶禮盒庫存控管")
+    st.caption("進度條顯示：紅色=庫存緊張 (賣很好)，綠色=庫存充足。")
+    
+    full_gift_df = load_gift_data(current_sheet)
+    
+    season_options = ["全部", "母親節", "端午節", "父親節", "中秋節", "CNY", "其他"]
+    selected_season = st.selectbox("📅 選擇顯示檔期", season_options, index=0)
+    
+    if selected_season == "全部":
+        display_df = full_gift_df.copy()
+    else:
+        display_df = full_gift_df[full_gift_df['檔期'] == selected_season].copy()
+    
+    if not display_df.empty:
+        total_qty = display_df["原始控量"].sum()
+        remain_qty = display_df["剩餘控量"].sum()
+        sold_qty = total_qty - remain_qty
+        sell_rate = (sold_qty / total_qty * 100) if total_qty > 0 else 0
+        
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("總控量", f"{total_qty} 盒")
+        c2.metric("已銷售", f"{sold_qty} 盒")
+        c3.metric("庫存剩餘", f"{remain_qty} 盒")
+        c4.metric("銷售進度", f"{sell_rate:.1f}%")
+        st.markdown("---")
+
+        # 單品項加減：只寫入這個品項的剩餘控量，尖峰時段頻繁扣量不必重寫整張表
+        st.markdown("##### 🛒 快速扣量 / 補回")
+        items = list(display_df[["檔期", "品項"]].itertuples(index=False, name=None))
+        q1, q2, q3, q4 = st.columns([3, 1, 1, 1], vertical_alignment="bottom")
+        picked = q1.selectbox("禮盒", items, format_func=lambda k: f"{k[0]}｜{k[1]}", key="gift_adjust_item")
+        qty = q2.number_input("數量", min_value=1, step=1, value=1, key="gift_adjust_qty")
+        sell, restock = q3.button("➖ 賣出", use_container_width=True), q4.button("➕ 補回", use_container_width=True)
+        delta = -qty if sell else qty if restock else 0
+        if delta and adjust_gift_stock(current_sheet, *picked, int(delta)) is not None:
+            st.toast(f"✅ {picked[1]} {int(delta):+d} 盒", icon="🎁")
+            st.rerun()
+        st.markdown("---")
+
+    edited_display_df = data_editor(
+        display_df,
+        column_config={
+            "檔期": st.column_config.SelectboxColumn("檔期", options=["母親節", "端午節", "父親節", "中秋節", "CNY", "其他"], required=True),
+            "品項": st.column_config.TextColumn("禮盒名稱", required=True, width="medium"),
+            "原始控量": st.column_config.NumberColumn("原始控量", min_value=0, step=1, format="%d"),
+            "剩餘控量": st.column_config.NumberColumn("剩餘控量", min_value=0, step=1, format="%d"),
+            "銷售進度": st.column_config.ProgressColumn(
+                "銷售進度", 
+                help="已銷售百分比", 
+                format="%.1f%%",
+                min_value=0, 
+                max_value=100
+            ),
+        },
+        num_rows="dynamic",
+        use_container_width=True,
+        key="gift_editor"
+    )
+    
+    if st.button("💾 儲存禮盒變更", type="primary"):
+        # 以 (檔期, 品項) 對齊、只比對目前顯示的檔期：其他檔期的列不經手，維持原本的位置
+        save_gift_data(current_sheet, display_df, edited_display_df)
+        st.rerun()
@@ -0,0 +1,60 @@
+import datetime
+
+import streamlit as st
+
+from data_layer import load_leave_data, save_leave_data, get_leave_index
+from views import data_editor
+
+def render(store_choice, current_sheet):
+    """頁面：夥伴休假管理。"""
+    st.title(f"👥 {store_choice} | 夥伴休假管理")
+    st.info("請輸入「假別週期」 (例: 20250706~20260705)，系統將自動計算到期日並進行預警。")
+    
+    leave_df = load_leave_data(current_sheet)
+    
+    tw_tz = datetime.timezone(datetime.timedelta(hours=8))
+    today_date = datetime.datetime.now(tw_tz).date()
+    
+    # 到期日依資料版本解析一次並排序，「90 天內到期」是一次區間查詢
+    expiring = get_leave_index(current_sheet).expiring(today_date, 90)
+    alert_messages = [
+        f"⚠️ {name} 的{'特代休' if kind == '特代休' else ' ' + label} ({period}) 即將於 {end.date()} 到期！剩餘 {hours} 小時未休。"
+        for name, kind, label, period, end, hours in expiring[["夥伴姓名", "類別", "假別", "週期", "到期日", "剩餘"]].itertuples(index=False)
+    ]
+
+    if alert_messages:
+        st.error(f"🚨 發現 {len(alert_messages)} 筆即將到期的休假！請儘速安排。")
+        for msg in alert_messages:
+            st.markdown(f'<div class="alert-box">{msg}</div>', unsafe_allow_html=True)
+    else:
+        st.success("✅ 目前無 3 個月內即將過期且未休完的假別。")
+        
+    st.markdown("---")
+
+    edited_leave_df = data_editor(
+        leave_df,
+        column_config={
+            "夥伴姓名": st.column_config.TextColumn("夥伴姓名", required=True),
+            "職級": st.column_config.SelectboxColumn("職級", options=["正職", "PT"], required=True, width="small"),
+            "假別週期": st.column_config.TextColumn("假別週期 (YYYYMMDD~YYYYMMDD)", required=True, width="medium", help="系統依據 '~' 後面的日期判斷到期日"),
+            "特休_剩餘": st.column_config.NumberColumn("特休剩餘", min_value=0.0, step=0.5, format="%.1f"),
+            "代休_剩餘": st.column_config.NumberColumn("代休剩餘", min_value=0.0, step=0.5, format="%.1f"),
+            "特殊假_名稱": st.column_config.TextColumn("特殊假 (自訂)", help="例: 婚假"),
+            "特殊假_總時數": st.column_config.NumberColumn("總時數", min_value=0.0, step=0.5),
+            "特殊假_週期": st.column_config.TextColumn("特殊假週期", help="例: 20260101~20260201"),
+            "特殊假_剩餘": st.column_config.NumberColumn("剩餘時數", min_value=0.0, step=0.5, format="%.1f"),
+        },
+        num_rows="dynamic",
+        use_container_width=True,
+        key="leave_editor"
+    )
+
+    if st.button("💾 儲存休假資料", type="primary"):
+        save_leave_data(current_sheet, leave_df, edited_leave_df)
+        st.rerun()
+
+    st.markdown("### 💡 管理提醒")
+    st.markdown("""
+    * **到期日自動偵測**：系統會自動抓取「週期」欄位中 **`~`** 符號後面的日期（格式需為 8 碼數字，如 `20260401`）。
+    * **預警規則**：當距離到期日 **< 90 天** 且 **剩餘時數 > 0** 時，上方會出現紅色警示。
+    """)
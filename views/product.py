@@ -0,0 +1,57 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from data_layer import get_product_index
+
+def render(store_choice, current_sheet):
+    """頁面：新品查詢與訂貨。"""
+    st.title(f"📦 {store_choice} | 新品查詢與訂貨")
+    
+    product_df, product_index = get_product_index(current_sheet)
+    product_df = product_df.copy()
+    
+    col_search, col_cat = st.columns(2)
+    with col_search:
+        search_term = st.text_input("🔍 搜尋新品 (輸入品名或品號)", "")
+    with col_cat:
+        all_seasons = ["全部"] + product_index.seasons
+        selected_season = st.selectbox("📅 依檔期篩選", all_seasons, index=0)
+
+    filtered_df = product_df.iloc[product_index.search(search_term, None if selected_season == "全部" else selected_season)]
+        
+    st.markdown(f"### 📋 商品清單 ({len(filtered_df)} 筆)")
+    st.dataframe(
+        filtered_df,
+        column_config={
+            "售價": st.column_config.NumberColumn("售價", format="$%d"),
+            "訂貨日": st.column_config.TextColumn("訂貨日", width="small"),
+            "上市日": st.column_config.TextColumn("上市日", width="small"),
+            "備註": st.column_config.TextColumn("備註", width="medium"),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    st.markdown("---")
+    st.subheader("🔔 近期訂貨提醒 (未來7日)")
+    
+    tw_tz = datetime.timezone(datetime.timedelta(hours=8))
+    today_date = datetime.datetime.now(tw_tz).date()
+    next_week = today_date + datetime.timedelta(days=7)
+    
+    try:
+        product_df['訂貨日_dt'] = pd.to_datetime(product_df['訂貨日'], errors='coerce').dt.date
+        upcoming_orders = product_df[
+            (product_df['訂貨日_dt'] >= today_date) & 
+            (product_df['訂貨日_dt'] <= next_week)
+        ]
+        
+        if not upcoming_orders.empty:
+            st.warning(f"未來 7 天內共有 {len(upcoming_orders)} 項商品開放訂貨！")
+            st.dataframe(upcoming_orders[['訂貨日', '分類', '品號', '品名', '備註']], hide_index=True)
+        else:
+            st.success("未來 7 天內無新的訂貨排程。")
+    except:
+        st.info("日期格式無法解析，暫無法顯示訂貨提醒。")
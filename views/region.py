@@ -0,0 +1,79 @@
+import datetime
+import time
+
+import pandas as pd
+import streamlit as st
+
+from data_layer import load_store_registry, load_region_data, month_target, summarize_kpis
+from storage import get_data_version
+
+def render(store_choice, current_sheet):
+    """頁面：區域總覽。"""
+    stores = load_store_registry()
+    st.title("🗺️ 區域營運總覽")
+    st.caption("同時讀取所有門市的營運報表，依月份彙整各店與全區 KPI (目標 = 各店行事曆的每日目標 x 當月天數，全區為各店加總)。")
+    
+    tw_tz = datetime.timezone(datetime.timedelta(hours=8))
+    today_date = datetime.datetime.now(tw_tz).date()
+    store_pairs = tuple((s["name"], s["sheet"]) for s in stores)
+    started = time.perf_counter()
+    versions = tuple((get_data_version(sheet, "daily"), get_data_version(sheet, "leave")) for _, sheet in store_pairs)
+    region_df, leave_index, region_errors = load_region_data(store_pairs, versions)
+    elapsed = time.perf_counter() - started
+    
+    for name, err in region_errors.items():
+        st.warning(f"⚠️ {name} 讀取失敗：{err}")
+    
+    if region_df.empty:
+        st.info("目前沒有可彙整的門市資料。")
+        st.stop()
+    
+    years = sorted({int(y) for y in region_df["Year"].unique()} | {today_date.year})
+    col_year, col_month = st.columns(2)
+    selected_year = col_year.selectbox("年度", years, index=years.index(today_date.year))
+    selected_month = col_month.selectbox("月份", range(1, 13), index=today_date.month - 1)
+    month_df = region_df[(region_df["Year"] == selected_year) & (region_df["Month"] == selected_month)]
+    rows = []
+    for name, store_df in month_df.groupby("門市", sort=False):
+        rows.append({"門市": name, **summarize_kpis(store_df, month_target(name, selected_year, selected_month))})
+    # 目標與每日營運報表的「全月累計」相同：各店行事曆的月目標，全區為各店加總
+    region_kpi = summarize_kpis(month_df, sum(r["total_target"] for r in rows))
+    
+    st.markdown("##### 🏆 全區績效")
+    r1, r2, r3, r4, r5 = st.columns(5)
+    r1.metric("全區 SALES", f"${region_kpi['total_sales']:,.0f}")
+    r2.metric("達成率", f"{region_kpi['achieve_rate']:.1f}%", delta=f"${region_kpi['total_sales'] - region_kpi['total_target']:,.0f}")
+    r3.metric("平均 ADT", f"{region_kpi['avg_adt']:,.0f}")
+    r4.metric("平均 AT", f"${region_kpi['avg_at']:,.0f}")
+    r5.metric("平均貢獻度", f"${region_kpi['avg_contrib']:,.0f}")
+    
+    st.markdown("##### 🏪 各門市 KPI")
+    store_kpi_df = pd.DataFrame(rows + [{"門市": "全區合計", **region_kpi}])
+    st.dataframe(
+        store_kpi_df[["門市", "total_sales", "total_target", "achieve_rate", "avg_psd", "avg_adt", "avg_at", "avg_contrib", "avg_delivery_total"]],
+        column_config={
+            "total_sales": st.column_config.NumberColumn("SALES", format="$%d"),
+            "total_target": st.column_config.NumberColumn("目標", format="$%d"),
+            "achieve_rate": st.column_config.NumberColumn("達成%", format="%.1f%%"),
+            "avg_psd": st.column_config.NumberColumn("平均 PSD", format="$%d"),
+            "avg_adt": st.column_config.NumberColumn("平均 ADT", format="%d"),
+            "avg_at": st.column_config.NumberColumn("平均 AT", format="$%d"),
+            "avg_contrib": st.column_config.NumberColumn("貢獻度", format="$%d"),
+            "avg_delivery_total": st.column_config.NumberColumn("外送 PSD", format="$%d"),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+    st.markdown("##### 👥 休假到期預警 (90 天內)")
+    expiring = leave_index.expiring(today_date, 90)
+    if expiring.empty:
+        st.success("✅ 全區目前無 3 個月內即將過期且未休完的假別。")
+    else:
+        alert_counts = leave_index.counts(today_date, 90)
+        st.dataframe(pd.DataFrame({"門市": [name for name, _ in store_pairs], "即將到期": [int(alert_counts.get(name, 0)) for name, _ in store_pairs]}),
+                     use_container_width=True, hide_index=True)
+        with st.expander(f"全區 {len(expiring)} 筆即將到期的休假"):
+            st.dataframe(expiring[["門市", "夥伴姓名", "假別", "週期", "到期日", "剩餘"]].assign(到期日=expiring["到期日"].dt.date),
+                         use_container_width=True, hide_index=True)
+    st.caption(f"共 {len(store_pairs)} 家門市，讀取耗時 {elapsed:.2f} 秒")